@@ -0,0 +1,113 @@
+from metrics_helpers import big_log10, big_log10_series, big_sum, big_sum_groups
+from gen_figures_linux import evaluate_metrics
+from plot_helpers_linux import trend_x
+from argparse import ArgumentParser
+import numpy as np
+import pandas as pd
+import time
+
+# MICRO-BENCHMARKS FOR THE METRICS HELPERS
+
+
+def model_counts(n, max_digits, seed=0):
+    # decimal strings of uniformly distributed length, with some missing and empty values like in solve_model-count
+    rng = np.random.default_rng(seed)
+    counts = [
+        str(rng.integers(1, 10)) + "".join(map(str, rng.integers(0, 10, length)))
+        for length in rng.integers(0, max_digits, n)
+    ]
+    for i in rng.choice(n, n // 20, replace=False):
+        counts[i] = rng.choice([None, ""])
+    return pd.Series(counts, dtype="string")
+
+
+def measure(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def evaluate_metric(df, extractor, x_value, x, y):
+    # the actual value at one point, as the prediction-accuracy plots looked it up before evaluate_metrics
+    rows = df[(df['extractor'] == extractor) & (
+        df[x] >= x_value)].sort_values(by=x)
+    if len(rows) > 0:
+        return rows[rows[x] == rows.iloc[0][x]][y].median()
+
+
+def bench_big_log10(args):
+    series = model_counts(args.rows, args.max_digits)
+    expected, expected_time = measure(
+        lambda: series.fillna("").apply(big_log10).replace(0, np.nan), args.repeat)
+    actual, actual_time = measure(
+        lambda: big_log10_series(series).replace(0, np.nan), args.repeat)
+    expected = expected.astype(object).where(expected.notna(), np.nan).astype(float)
+    assert (expected.isna() == actual.isna()).all()
+    print(f"big_log10 on {len(series)} model counts with up to {args.max_digits} digits:")
+    print(f"  per element: {expected_time:.4f}s")
+    print(f"  batched:     {actual_time:.4f}s ({expected_time / actual_time:.1f}x)")
+    print(f"  maximum deviation: {np.nanmax(np.abs(expected - actual)):.3g}")
+
+
+def bench_big_sum(args):
+    df = pd.DataFrame({
+        "group": np.random.default_rng(0).integers(0, args.groups, args.rows),
+        "count": model_counts(args.rows, args.max_digits),
+    })
+    expected, expected_time = measure(
+        lambda: df.groupby("group").agg({"count": big_sum})["count"], args.repeat)
+    actual, actual_time = measure(
+        lambda: big_sum_groups(df, ["group"], "count")["digits"], args.repeat)
+    _, exact_time = measure(
+        lambda: big_sum_groups(df, ["group"], "count", exact=True), args.repeat)
+    assert expected.fillna(0).astype(int).equals(actual.fillna(0).astype(int))
+    print(f"big_sum on {len(df)} model counts in {args.groups} groups:")
+    print(f"  per group: {expected_time:.4f}s")
+    print(f"  batched:   {actual_time:.4f}s ({expected_time / actual_time:.1f}x)")
+    print(f"  exact:     {exact_time:.4f}s")
+
+
+def bench_evaluate_metric(args):
+    # one revision per day with several rows (e.g., architectures) each, evaluated at every revision of the
+    # second half, as for the prediction accuracies; per point, this is quadratic, so at most 5000 rows are used
+    rng = np.random.default_rng(0)
+    rows = min(args.rows, 5000)
+    df = pd.DataFrame({
+        "extractor": rng.choice(["KConfigReader", "KClause"], rows),
+        "committer_date": pd.Timestamp("2000-01-01") + pd.to_timedelta(rng.integers(0, rows // 10, rows), unit="D"),
+        "#features": rng.normal(10000, 1000, rows),
+    })
+    groups = [(df, "committer_date", "#features", extractor) for extractor in ["KConfigReader", "KClause"]]
+    points = [(i, x_value) for i, (_, x, _, extractor) in enumerate(groups)
+              for x_value in sorted(df.loc[df["extractor"] == extractor, x].unique())[rows // 20:]]
+    expected, expected_time = measure(
+        lambda: np.array([evaluate_metric(df, groups[i][3], x_value, groups[i][1], groups[i][2])
+                          for i, x_value in points]), args.repeat)
+    frame = pd.DataFrame({"group": [i for i, _ in points], "x": trend_x(pd.Series([x for _, x in points]))})
+    actual, actual_time = measure(lambda: evaluate_metrics(groups, frame), args.repeat)
+    print(f"evaluate_metric at {len(points)} points of {rows} rows:")
+    print(f"  per point: {expected_time:.4f}s")
+    print(f"  batched:   {actual_time:.4f}s ({expected_time / actual_time:.1f}x)")
+    print(f"  maximum deviation: {np.nanmax(np.abs(expected.astype(float) - actual)):.3g}")
+
+
+BENCHMARKS = {
+    "big_log10": bench_big_log10,
+    "big_sum": bench_big_sum,
+    "evaluate_metric": bench_evaluate_metric,
+}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser("Torte Dashboard Benchmarks")
+    parser.add_argument("--benchmark", "-b", action="append", choices=list(BENCHMARKS))
+    parser.add_argument("--rows", "-n", type=int, default=100000)
+    parser.add_argument("--max-digits", type=int, default=400)
+    parser.add_argument("--groups", type=int, default=1000)
+    parser.add_argument("--repeat", "-r", type=int, default=3)
+    args = parser.parse_args()
+    for benchmark in args.benchmark or BENCHMARKS:
+        BENCHMARKS[benchmark](args)
@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+from importlib.util import find_spec
+from cache_helpers import file_digest
+
+
+# INCREMENTAL BUILDS
+# the manifest records, for each build step (e.g., one figure of one architecture, or one metric), the digest of
+# the inputs it was built from and the generator version, together with the figure files or projectData entries
+# it produced; a step whose inputs and version are unchanged and whose outputs still exist is skipped
+
+
+def digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def source_version(*modules):
+    """digest of the source code of the given modules, which changes whenever the generator does"""
+    sources = hashlib.sha1()
+    for module in modules:
+        with open(find_spec(module).origin, "rb") as f:
+            sources.update(f.read())
+    return sources.hexdigest()
+
+
+class BuildManifest:
+    SECTIONS = ["figures", "projectData"]
+
+    def __init__(self, path, version, force=False):
+        self.path = path
+        self.version = version
+        self.force = force
+        self.manifest = {"inputs": dict()} | {section: dict() for section in self.SECTIONS}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as fp:
+                    self.manifest |= json.load(fp)
+            except (OSError, ValueError) as e:
+                print(f"Could not read build manifest '{path}' ({e}), rebuilding everything.")
+        self.counts = {section: {"skipped": 0, "built": 0} for section in self.SECTIONS}
+
+    def file_digest(self, path):
+        """content digest of an input file, or None if it does not exist
+
+        Like the stage cache, the digest is reused as long as size and mtime of the file are unchanged."""
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        entry = self.manifest["inputs"].get(key)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_digest(path)}
+            self.manifest["inputs"][key] = entry
+        return entry["sha256"]
+
+    def is_current(self, section, step, inputs, exists=os.path.exists):
+        """whether a step was built from the same inputs by the same generator and all its outputs still exist"""
+        entry = self.manifest[section].get(step)
+        current = not self.force and self.path is not None and entry is not None \
+            and entry["inputs"] == inputs and entry["version"] == self.version \
+            and all(exists(output) for output in entry["outputs"])
+        self.counts[section]["skipped" if current else "built"] += 1
+        return current
+
+    def record(self, section, step, inputs, outputs, exists=os.path.exists):
+        missing = [output for output in outputs if not exists(output)]
+        if missing:
+            # is_current would fail for them, so that the step would be rebuilt on every run
+            print(f"Build step '{step}' recorded outputs that do not exist: {', '.join(sorted(missing))}")
+        self.manifest[section][step] = {"inputs": inputs, "version": self.version,
+                                        "outputs": sorted(set(outputs))}
+
+    def report(self, section, label):
+        counts = self.counts[section]
+        total = counts["skipped"] + counts["built"]
+        if total:
+            print(f"Skipped {counts['skipped']} of {total} {label} steps with unchanged inputs"
+                  f"{' (forced rebuild)' if self.force else ''}, built {counts['built']}")
+        self.counts[section] = {"skipped": 0, "built": 0}
+
+    def save(self):
+        if not self.path:
+            return
+        with open(f"{self.path}.tmp", "w") as fp:
+            json.dump(self.manifest, fp, indent=1, sort_keys=True)
+        os.replace(f"{self.path}.tmp", self.path)
@@ -0,0 +1,99 @@
+import pandas as pd
+import os
+import json
+import hashlib
+
+try:
+    import pyarrow  # noqa: F401 (parquet engine for the stage cache)
+except ImportError:
+    pyarrow = None
+
+
+# COLUMNAR CACHE FOR TORTE STAGE CSVS
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(path, options):
+    key = json.dumps([os.path.abspath(path), options], sort_keys=True, default=str)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def read_cache_meta(path):
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache_meta(meta, path):
+    with open(f"{path}.tmp", "w") as fp:
+        json.dump(meta, fp)
+    os.replace(f"{path}.tmp", path)
+
+
+def is_cache_valid(meta, source, stat):
+    """Checks a cache entry against its source CSV.
+
+    Size and mtime are compared first; if only the mtime changed (e.g., the
+    experiment output was copied), the content hash decides."""
+    if meta is None or meta.get("source") != os.path.abspath(source):
+        return False
+    if meta.get("size") != stat.st_size:
+        return False
+    if meta.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    return meta.get("sha256") == file_digest(source)
+
+
+def read_csv(path, usecols=None, **kwargs):
+    # unlike pd.read_csv, columns in usecols that are missing from the file are ignored
+    if usecols is not None and not callable(usecols):
+        columns = set(usecols)
+        usecols = lambda column: column in columns
+    return pd.read_csv(path, usecols=usecols, **kwargs)
+
+
+def read_csv_cached(path, cache_directory=None, **kwargs):
+    """Reads a CSV file through a parquet cache in cache_directory.
+
+    The cache is keyed by the source path and the read options, and validated
+    against the size, mtime and content hash of the source. Falls back to
+    pd.read_csv if no cache directory is given, pyarrow is not installed, or
+    the cache cannot be read or written."""
+    if not cache_directory or pyarrow is None:
+        return read_csv(path, **kwargs)
+    key = cache_key(path, kwargs)
+    cache_path = f"{cache_directory}/{key}.parquet"
+    meta_path = f"{cache_directory}/{key}.json"
+    stat = os.stat(path)
+    meta = read_cache_meta(meta_path)
+    if os.path.exists(cache_path) and is_cache_valid(meta, path, stat):
+        try:
+            df = pd.read_parquet(cache_path)
+            if meta["mtime_ns"] != stat.st_mtime_ns:
+                write_cache_meta(meta | {"mtime_ns": stat.st_mtime_ns}, meta_path)
+            return df
+        except Exception as e:
+            print(f"Could not read cache for '{path}' ({e}), reading CSV instead.")
+    df = read_csv(path, **kwargs)
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        df.to_parquet(f"{cache_path}.tmp", engine="pyarrow")
+        os.replace(f"{cache_path}.tmp", cache_path)
+        write_cache_meta({
+            "source": os.path.abspath(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_digest(path),
+        }, meta_path)
+    except Exception as e:
+        print(f"Could not cache '{path}' ({e}).")
+    return df
@@ -0,0 +1,113 @@
+import os
+import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli  # optional, only .gz siblings are written without it
+except ImportError:
+    brotli = None
+
+
+# PRECOMPRESSION
+# after generation, every figure, plotly.js, init.json and project shard gets .gz and .br siblings, so that a static server can
+# send them as they are (e.g., gzip_static/brotli_static in nginx) instead of compressing on every request
+
+
+COMPRESSIBLE = (".html", ".json", ".js")
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9  # 11 is about 5% smaller, but 20 times slower, which matters with plotly.js inlined
+
+
+def compressors(brotli_quality=BROTLI_QUALITY):
+    # gzip without a timestamp, so that the same content is always compressed to the same bytes
+    methods = {".gz": lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        methods[".br"] = lambda data: brotli.compress(data, quality=brotli_quality)
+    return methods
+
+
+def compressible_files(directories, files=()):
+    paths = [path for path in files if os.path.isfile(path)]
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            paths += [os.path.join(root, name) for name in sorted(names) if name.endswith(COMPRESSIBLE)]
+    return sorted(set(paths))
+
+
+def remove_orphans(directories):
+    """removes compressed siblings of files that no longer exist (e.g., previous versions of hashed figures)"""
+    removed = 0
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            for name in names:
+                base, suffix = os.path.splitext(name)
+                if suffix in (".gz", ".br") and base.endswith(COMPRESSIBLE) and base not in names:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+    return removed
+
+
+def compress_file(path, methods):
+    """writes the compressed siblings of path that are older than path, returns (suffix, size, compressed size)"""
+    results = []
+    mtime = os.stat(path).st_mtime_ns
+    pending = [suffix for suffix in methods
+               if not os.path.isfile(path + suffix) or os.stat(path + suffix).st_mtime_ns < mtime]
+    if not pending:
+        return results
+    with open(path, "rb") as f:
+        data = f.read()
+    for suffix in pending:
+        compressed = methods[suffix](data)
+        # temporary file and rename as in write_if_changed, one per sibling as the threads share a pid
+        with open(f"{path}{suffix}.{os.getpid()}.tmp", "wb") as f:
+            f.write(compressed)
+        os.replace(f"{path}{suffix}.{os.getpid()}.tmp", path + suffix)
+        results.append((suffix, len(data), len(compressed)))
+    return results
+
+
+def compress_outputs(directories, files=(), workers=None, brotli_quality=BROTLI_QUALITY):
+    """writes .gz (and, if brotli is installed, .br) siblings for all figures in the given directories and the given
+    files, in parallel threads (zlib and brotli release the GIL), skipping those whose siblings are newer"""
+    start = time.perf_counter()
+    methods = compressors(brotli_quality)
+    paths = compressible_files(directories, files)
+    removed = remove_orphans(directories)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda path: compress_file(path, methods), paths))
+    count = sum(1 for result in results if result)
+    print(f"Compressed {count} of {len(paths)} files in {time.perf_counter() - start:.2f}s, "
+          f"{len(paths) - count} up to date, {removed} outdated siblings removed"
+          f"{'' if brotli else ' (install brotli for .br files)'}")
+    for suffix in methods:
+        sizes = [(size, compressed) for result in results for method, size, compressed in result if method == suffix]
+        if sizes:
+            size, compressed = map(sum, zip(*sizes))
+            ratios = sorted(size / compressed for size, compressed in sizes)
+            print(f"  {suffix}: {size / 2**20:.2f} MiB to {compressed / 2**20:.2f} MiB, ratio {size / compressed:.1f} "
+                  f"(median {ratios[len(ratios) // 2]:.1f} per file)")
+
+
+def figure_directories(config):
+    """all figures directories of a configuration, with the same defaults as the generators"""
+    directories = {config.get("figures_directory", "src/public/figures")}
+    if config.get("linux", dict()).get("output_directory") is not None:
+        directories.add(config.get("figures_directory", config["linux"].get("figures_directory", "src/public/figures")))
+    for project in config.get("nonLinux", dict()).values():
+        directories.add(project.get("figures_directory", "src/public/figures"))
+    return sorted(directory for directory in directories if os.path.isdir(directory))
+
+
+def compress_main(config: str, always: bool = False, init_json_path="src/public/init.json"):
+    with open(config) as fp:
+        config = json.load(fp)
+    if not (always or config.get("compress_outputs", False)):
+        return
+    # together with the project shards next to init.json
+    directories = figure_directories(config) + [os.path.join(os.path.dirname(init_json_path), "projects")]
+    compress_outputs([directory for directory in directories if os.path.isdir(directory)], [init_json_path],
+                     config.get("compress_workers"),
+                     config.get("brotli_quality", BROTLI_QUALITY))
@@ -3,21 +3,28 @@ import numpy as np
 import os
 import json
 import pickle
-from math import log10
+import time
+import multiprocessing
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from plot_helpers_linux import *
 from metrics_helpers import *
+from cache_helpers import read_csv_cached
+from output_helpers import FIGURE_OPTIONS, configure_figures, reset_write_stats, add_write_stats, report_writes, \
+    written_figures
+from build_helpers import BuildManifest, digest, source_version
 from tqdm import tqdm
 from argparse import ArgumentParser
 # UTILITY FUNCTIONS
 
 
 def read_dataframe(
-    stage, dtype={}, usecols=None, file=None, output_directory="output-linux"
+    stage, dtype={}, usecols=None, file=None, output_directory="output-linux", cache_directory=None
 ):
     if not file:
         file = "output"
-    df = pd.read_csv(
-        f"{output_directory}/{stage}/{file}.csv", dtype=dtype, usecols=usecols
+    df = read_csv_cached(
+        f"{output_directory}/{stage}/{file}.csv", cache_directory, dtype=dtype, usecols=usecols
     )
     if "committer_date_unix" in df:
         df["committer_date"] = df["committer_date_unix"].apply(
@@ -26,46 +33,178 @@ def read_dataframe(
     return df
 
 
-def replace_values(df):
-    df.replace("kconfigreader", "KConfigReader", inplace=True)
-    df.replace("kmax", "KClause", inplace=True)
-
-
-def big_log10(str):
-    return log10(int(str)) if not pd.isna(str) and str != "" else pd.NA
-
-
-def process_model_count(df_solve):
-    df_solve["model-count"] = df_solve["model-count"].replace("1", "")
-    df_solve["model-count-log10"] = (
-        df_solve["model-count"].fillna("").apply(big_log10).replace(0, np.nan)
-    )
-    df_solve["year"] = df_solve["committer_date"].apply(lambda d: int(d.year))
-
-
 def unify_solvers(df, columns=['model-count-unconstrained-log10']):
     return df[['revision', 'committer_date', 'architecture', 'extractor', *columns]].drop_duplicates()
 
 
-def big_sum(series):
-    big_sum = sum([int(value)
-                  for value in series if not pd.isna(value) and value])
-    if big_sum > 0:
-        return len(str(big_sum))
+def read_json(path):
+    with open(path) as json_data:
+        return json.load(json_data)
 
 
-def write_object_to_file(obj, name):
-    with open(name, "w") as fp:
-        json.dump(obj, fp)
+def derived(*dependencies):
+    """memoizes a Linux dataframe that is computed on first access from the given inputs and dataframes"""
+    def decorator(func):
+        prop = cached_property(func)
+        prop.dependencies = dependencies
+        return prop
+    return decorator
+
+
+def split_metric(df, x, y, extractor):
+    """the observations of extractor sorted by x, split into the first half (rounded up) and the second half"""
+    df_all = df[(df['extractor'] == extractor)].sort_values(
+        by=x, kind='stable').dropna(subset=[y])
+    mid = len(df_all) * -1 // 2 * -1
+    return df_all[0:mid], df_all[mid:]
+
+
+def evaluate_metrics(groups, points):
+    """the actual values at the given points, i.e., the median y of the first x of their group at or after them
+
+    groups is a list of (df, x, y, extractor), and points is a frame with the group (its position in groups)
+    and the x (as converted by trend_x) of each point. The median of each x of each group is aggregated once,
+    and all points are resolved to the median of the next x of their group with one merge_asof."""
+    actual = pd.concat([pd.DataFrame({'group': i, 'x': trend_x(df.loc[df['extractor'] == extractor, x]),
+                                      'y': as_float(df.loc[df['extractor'] == extractor, y])})
+                        for i, (df, x, y, extractor) in enumerate(groups)])
+    medians = actual.dropna(subset=['x']).groupby(['group', 'x'], as_index=False)['y'].median()
+    resolved = pd.merge_asof(points[['group', 'x']].reset_index(drop=True).reset_index().sort_values('x', kind='stable'),
+                             medians.sort_values('x', kind='stable'), on='x', by='group', direction='forward')
+    return resolved.sort_values('index')['y'].to_numpy()
+
+
+def estimate_metrics(groups):
+    """the deviations of the trends fitted to the first half of each group's observations from the second half
+
+    groups is a list of (df, x, y, extractor), as for evaluate_metrics. The trends of all groups
+    are fitted at once with fit_trends and evaluated at once with evaluate_metrics. Returns a frame with the
+    group (its position in groups) and deviation of each test point, ordered by group and x; groups with less
+    than three observations have none."""
+    splits = [split_metric(*group) for group in groups]
+    trains = [pd.DataFrame({'group': i, 'x': trend_x(train[x]), 'y': as_float(train[y])})
+              for i, ((_, x, y, _), (train, test)) in enumerate(zip(groups, splits)) if len(train) + len(test) >= 3]
+    if not trains:
+        return pd.DataFrame({'group': pd.Series(dtype=int), 'deviation': pd.Series(dtype=float)})
+    fits = fit_trends(pd.concat(trains), 'x', 'y', by=['group'])
+    points = pd.concat([pd.DataFrame({'group': i, 'x': trend_x(splits[i][1][groups[i][1]])}) for i in fits.index],
+                       ignore_index=True)
+    estimated = fits['intercept'].reindex(points['group']).to_numpy() \
+        + fits['slope'].reindex(points['group']).to_numpy() * points['x'].to_numpy()
+    return points.assign(deviation=estimated / evaluate_metrics(groups, points) - 1)[['group', 'deviation']]
+
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60  # years of 365 days, as in the history of a metric
+
+
+def backtest_metric(df, x, y, extractor, horizons, tolerance):
+    """the deviations of the trends fitted to all observations up to each release (the rolling origin) from the
+    actual values the given numbers of years after it
+
+    x must be a date. The trends of all origins are computed at once from cumulative sums over the observations
+    sorted by date. The actual value horizon years after an origin is that of the first release at least horizon
+    years after it (the median, as with evaluate_metrics), if that is at most tolerance days later. Returns a frame
+    with the horizon and deviation of each origin and horizon, by horizon and origin."""
+    df = df[df['extractor'] == extractor]
+    observations = df.dropna(subset=[y]).sort_values(by=x, kind='stable')
+    t = trend_x(observations[x]).to_numpy()
+    v = as_float(observations[y]).to_numpy()
+    # in years since the first observation and around the mean, so that the cumulative sums stay accurate
+    years = (t - t[0]) / SECONDS_PER_YEAR if len(t) else t
+    centered = v - v.mean() if len(v) else v
+    n = np.arange(1, len(t) + 1)
+    sx, sy, sxx, sxy = np.cumsum(years), np.cumsum(centered), np.cumsum(years ** 2), np.cumsum(years * centered)
+    last = np.r_[t[1:] != t[:-1], True]
+    # an origin after the last observation of each release, with at least three observations of two releases
+    origin = last & (n >= 3) & (np.cumsum(np.r_[True, t[1:] != t[:-1]]) >= 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx ** 2)
+        intercept = (sy - slope * sx) / n + (v.mean() if len(v) else 0)
+    releases = t[last]
+    medians = as_float(df[y]).groupby(trend_x(df[x]).to_numpy()).median()
+    deviations = []
+    for horizon in horizons:
+        target = t[origin] + horizon * SECONDS_PER_YEAR
+        index = np.minimum(np.searchsorted(releases, target), len(releases) - 1)
+        resolved = releases[index] if len(releases) else target
+        found = (resolved >= target) & (resolved - target <= tolerance * 24 * 60 * 60)
+        estimated = intercept[origin] + slope[origin] * (resolved - t[0]) / SECONDS_PER_YEAR
+        actual = medians.reindex(resolved).to_numpy()
+        deviations.append(pd.DataFrame({'horizon': horizon, 'deviation': (estimated / actual - 1)[found]}))
+    return pd.concat(deviations, ignore_index=True) if deviations else \
+        pd.DataFrame({'horizon': pd.Series(dtype=float), 'deviation': pd.Series(dtype=float)})
+
+
+# the groups the worker processes backtest, inherited through fork like _figures_linux
+_backtest_groups = None
+
+
+def _backtest_metrics(indices, horizons, tolerance):
+    return [(i, backtest_metric(*_backtest_groups[i], horizons, tolerance)) for i in indices]
+
+
+def backtest_metrics(groups, horizons, tolerance, jobs=1):
+    """backtest_metric for each group of a list of (df, x, y, extractor), distributed over jobs processes
+
+    Returns a frame with the group (its position in groups), horizon and deviation of each backtested prediction."""
+    global _backtest_groups
+    if jobs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        jobs = 1
+    chunks = [list(range(len(groups)))[job::jobs] for job in range(jobs)]
+    _backtest_groups = groups
+    try:
+        if jobs > 1:
+            with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+                results = [result for chunk in executor.map(_backtest_metrics, chunks, [horizons] * jobs,
+                                                            [tolerance] * jobs) for result in chunk]
+        else:
+            results = _backtest_metrics(chunks[0], horizons, tolerance)
+    finally:
+        _backtest_groups = None
+    results = [deviations.assign(group=i) for i, deviations in sorted(results, key=lambda result: result[0])]
+    return pd.concat(results, ignore_index=True)[['group', 'horizon', 'deviation']] if results else \
+        pd.DataFrame({'group': pd.Series(dtype=int), 'horizon': pd.Series(dtype=float),
+                      'deviation': pd.Series(dtype=float)})
 
 
-def read_json(path):
-    with open(path) as json_data:
-        return json.load(json_data)
+# the Linux instance whose figures the worker processes generate, inherited through fork instead of pickled per task
+_figures_linux = None
+
+
+def _generate_architecture_figures(arch, figures):
+    reset_write_stats()
+    outputs = _figures_linux.generate_architecture_figures(arch, figures)
+    return arch, outputs, reset_write_stats()
 
 
 class Linux:
-    def __init__(self, config: str):
+    # inputs are stage CSVs (optionally "<stage>/<file>"), the 6h-timeout CSV and the linux-features.dat pickle;
+    # everything else is derived from them on first access, see the dependencies declared with @derived
+    # the projectData metrics and the dataframes they are computed from (all of them per architecture in df_kconfig)
+    METRICS = {
+        "total-features": ["df_kconfig", "df_total_features"],
+        "features": ["df_kconfig", "df_features"],
+        "source_lines_of_code": ["df_kconfig"],
+        "model-count": ["df_kconfig", "df_solve_slice", "df_solve_total"],
+        "model-count-time": ["df_kconfig", "df_solve_slice"],
+    }
+    # the figures plotted for each architecture and the dataframes they are plotted from, see plot_figure
+    FIGURES = {
+        "configuration-evolution": ["df_solve_total_diff", "df_solve_unconstrained_diff"],
+        "configuration-similarity": ["df_solve_unconstrained"],
+        "feature-evolution": ["df_features"],
+        "features": ["df_features"],
+        "jaccard-similarity": ["df_features"],
+        "model-count": ["df_solve_total", "df_solve_slice"],
+        "model-count-time": ["df_solve"],
+        "prediction-accuracy": ["deviations"],
+        "share-of-feature-variables": ["df_solve_unconstrained"],
+        "source_lines_of_code": ["df_kconfig"],
+        "total-features": ["df_features"],
+    }
+    VERSION_MODULES = ["gen_figures_linux", "plot_helpers_linux", "metrics_helpers", "output_helpers", "cache_helpers"]
+
+    def __init__(self, config: str, jobs: int = 1, force: bool = False):
         self.config = read_json(config)
         self.output_directory = self.config["linux"].get(
             "output_directory", "output-linux")
@@ -80,239 +219,361 @@ class Linux:
         self.figures_directory = self.config.get(
             "figures_directory", self.figures_directory)
         print(f"Will save figures to {self.figures_directory}")
+        self.cache_directory = self.config["linux"].get(
+            "cache_directory", self.config.get("cache_directory", ".cache"))
+        self.load_workers = self.config["linux"].get("load_workers")
         if not os.path.exists(self.figures_directory):
             os.mkdir(self.figures_directory)
-        self.df_kconfig = self.read_dataframe("kconfig")
-        self.df_kconfig["year"] = self.df_kconfig["committer_date"].apply(
-            lambda d: int(d.year)
-        )
-        self.df_architectures = self.read_dataframe("read-linux-architectures")
-        self.architectures = self.df_architectures["architecture"].unique()
-        self.architectures = np.append(self.architectures, "all")
-        self.df_architectures = self.df_architectures.sort_values(
+        self.inputs = dict()
+        self.partitions = dict()
+
+        self.keymap = {
+            "#total_features": "total-features",
+            "#features": "features",
+            "backbone.dimacs-analyzer-time": "model-count-time",
+            "model-count-unconstrained-log10": "model-count",
+            "model-count-unconstrained": "model-count",
+            "source_lines_of_code": "source_lines_of_code"
+        }
+        configure_figures(self.config)
+        self.history = history_options(self.config)
+        # with backtest_horizons, the trends are backtested from every release instead of split in half
+        self.backtest = {"horizons": self.config["linux"]["backtest_horizons"],
+                         "tolerance": self.config["linux"].get("backtest_tolerance", HISTORY_TOLERANCE)} \
+            if self.config["linux"].get("backtest_horizons") else None
+        self.jobs = jobs
+        self.build = BuildManifest(self.config.get("build_manifest", ".build-manifest.json"),
+                                   source_version(*self.VERSION_MODULES), force)
+        if self.config["linux"].get("generate_figures", False):
+            self.generate_figures(jobs)
+        self.generate_metrics()
+        if self.config["linux"].get("report_memory", False):
+            print("Memory usage of Linux dataframes:")
+            report_memory(self.inputs | vars(self))
+
+    @classmethod
+    def dependencies(cls, *names):
+        """returns the dataframes and inputs the given dataframes (transitively) depend on"""
+        dataframes, inputs = set(), set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            attribute = getattr(cls, name, None)
+            if hasattr(attribute, "dependencies"):
+                if name not in dataframes:
+                    dataframes.add(name)
+                    pending.extend(attribute.dependencies)
+            else:
+                inputs.add(name)
+        return dataframes, inputs
+
+    def prepare(self, *names):
+        """loads all inputs needed for the given dataframes concurrently, the dataframes are computed on access"""
+        dataframes, inputs = self.dependencies(*names)
+        print(f"Preparing {len(dataframes)} dataframes from {len(inputs)} inputs")
+        self.load_dataframes(sorted(inputs), self.load_workers)
+
+    @derived("kconfig")
+    def df_kconfig(self):
+        df = self.input("kconfig")
+        df["year"] = df["committer_date"].apply(lambda d: int(d.year))
+        replace_values(df)
+        return df
+
+    @derived("read-linux-architectures")
+    def architectures(self):
+        return np.append(self.input("read-linux-architectures")["architecture"].unique(), "all")
+
+    @derived("read-linux-architectures")
+    def df_architectures(self):
+        df = self.input("read-linux-architectures").sort_values(
             by="committer_date")
-        self.df_architectures["year"] = self.df_architectures["committer_date"].apply(
-            lambda d: int(d.year)
-        )
-        self.df_configs = self.read_dataframe("read-linux-configs")
-        self.df_configs = self.df_configs[
-            ~self.df_configs["kconfig-file"].str.contains("/um/")
-        ]
-        self.df_config_types = self.read_dataframe(
-            "read-linux-configs", file="output.types"
-        )
-        self.df_config_types = self.df_config_types[
-            ~self.df_config_types["kconfig-file"].str.contains("/um/")
-        ]
-        self.df_config_types = self.df_config_types.merge(
+        df["year"] = df["committer_date"].apply(lambda d: int(d.year))
+        return df
+
+    @derived("read-linux-configs")
+    def df_configs(self):
+        df = self.input("read-linux-configs")
+        return df[~df["kconfig-file"].str.contains("/um/")]
+
+    @derived("read-linux-configs/output.types", "df_architectures")
+    def df_config_types(self):
+        df = self.input("read-linux-configs/output.types")
+        df = df[~df["kconfig-file"].str.contains("/um/")]
+        return df.merge(
             self.df_architectures[["revision",
                                    "committer_date"]].drop_duplicates()
         )
-        self.df_uvl = self.read_dataframe("model_to_uvl_featureide")
-        self.df_smt = self.read_dataframe("model_to_smt_z3")
-        self.df_dimacs = self.read_dataframe("dimacs")
-        self.df_backbone_dimacs = self.read_dataframe("backbone-dimacs")
-        self.df_solve = self.read_dataframe(
-            "solve_model-count", {"model-count": "string"}
-        )
-        process_model_count(self.df_solve)
-        if os.path.isfile(f'{self.output_directory}/model-count-with-6h-timeout.csv'):
-            self.df_solve_6h = pd.read_csv(
-                f'{self.output_directory}/model-count-with-6h-timeout.csv', dtype={'model-count': 'string'})
-            self.df_solve_6h = self.df_backbone_dimacs.merge(self.df_solve_6h)
-            process_model_count(self.df_solve_6h)
-            self.df_solve = pd.merge(self.df_solve, self.df_solve_6h[['revision', 'architecture', 'extractor', 'backbone.dimacs-analyzer']], indicator=True, how='outer') \
+
+    @derived("model_to_uvl_featureide")
+    def df_uvl(self):
+        df = self.input("model_to_uvl_featureide")
+        replace_values(df)
+        return df
+
+    @derived("model_to_smt_z3")
+    def df_smt(self):
+        df = self.input("model_to_smt_z3")
+        replace_values(df)
+        return df
+
+    @derived("dimacs")
+    def df_dimacs(self):
+        df = self.input("dimacs")
+        replace_values(df)
+        return df
+
+    @derived("backbone-dimacs")
+    def df_backbone_dimacs(self):
+        df = self.input("backbone-dimacs").copy()
+        replace_values(df)
+        return df
+
+    @derived("model-count-with-6h-timeout", "backbone-dimacs")
+    def df_solve_6h(self):
+        df = self.input("model-count-with-6h-timeout")
+        if df is None:
+            return None
+        df = self.input("backbone-dimacs").merge(df)
+        process_model_count(df)
+        return df
+
+    @derived("solve_model-count", "df_solve_6h")
+    def df_solve(self):
+        df = self.input("solve_model-count")
+        process_model_count(df)
+        if self.df_solve_6h is not None:
+            df = pd.merge(df, self.df_solve_6h[['revision', 'architecture', 'extractor', 'backbone.dimacs-analyzer']], indicator=True, how='outer') \
                 .query('_merge=="left_only"') \
                 .drop('_merge', axis=1)
-            self.df_solve = pd.concat([self.df_solve, self.df_solve_6h])
-        else:
-            self.df_solve_6h = None
-        for df in [
-            self.df_kconfig,
-            self.df_uvl,
-            self.df_smt,
-            self.df_dimacs,
-            self.df_backbone_dimacs,
-            self.df_solve,
-        ]:
-            df.replace("kconfigreader", "KConfigReader", inplace=True)
-            df.replace("kmax", "KClause", inplace=True)
-        self.df_configs_configurable = self.df_configs.copy()
-        self.df_configs_configurable["configurable"] = False
-        with open(f"{self.output_directory}/linux-features.dat", "rb") as f:
-            [
-                self.features_by_kind_per_architecture,
-                self.df_extractor_comparison,
-                self.potential_misses_grep,
-                self.potential_misses_kmax,
-                self.df_configs_configurable,
-            ] = pickle.load(f)
-
-        replace_values(self.features_by_kind_per_architecture)
-        self.df_features = pd.merge(
+            df = pd.concat([df, self.df_solve_6h])
+        replace_values(df)
+        return df
+
+    @derived("linux-features.dat")
+    def features_by_kind_per_architecture(self):
+        # the pickle also holds df_extractor_comparison, potential_misses_grep, potential_misses_kmax
+        # and df_configs_configurable, which are not used by the dashboard
+        df = self.input("linux-features.dat")[0]
+        replace_values(df)
+        return df
+
+    @derived("df_architectures", "features_by_kind_per_architecture", "df_kconfig")
+    def df_features(self):
+        df_features = pd.merge(
             self.df_architectures, self.features_by_kind_per_architecture, how="outer"
         ).sort_values(by="committer_date")
-        self.df_features = pd.merge(
-            self.df_kconfig, self.df_features, how="outer"
+        return pd.merge(
+            self.df_kconfig, df_features, how="outer"
         ).sort_values(by="committer_date")
-        self.df_total_features = (
-            self.df_features.groupby(["extractor", "revision"])
+
+    @derived("df_features", "df_kconfig")
+    def df_total_features(self):
+        df_total_features = (
+            self.df_features.groupby(["extractor", "revision"], observed=True)
             .agg({"#total_features": "min"})
             .reset_index()
         )
-        self.df_total_features = pd.merge(
+        return pd.merge(
             self.df_kconfig[["committer_date", "revision"]].drop_duplicates(),
-            self.df_total_features,
-        )
-        self.df_solve_unconstrained = self.df_solve.merge(self.df_features)
-        self.df_solve_unconstrained["model-count-unconstrained"] = self.df_solve_unconstrained.apply(
-            lambda row: str(
-                int(row["model-count"])
-                * (2 ** int(row["unconstrained_bools"]))
-                * (3 ** int(row["unconstrained_tristates"]))
-            )
-            if not pd.isna(row["model-count"]) and row["model-count"] != ""
-            else pd.NA,
-            axis=1,
-        )
-        self.df_solve_unconstrained["model-count-unconstrained-log10"] = (
-            self.df_solve_unconstrained["model-count-unconstrained"]
-            .fillna("")
-            .map(big_log10)
-            .replace(0, np.nan)
-        )
-        self.df_solve_unconstrained["similarity"] = self.df_solve_unconstrained.apply(
-            lambda row: int(row["model-count"]) /
-            int(row["model-count-unconstrained"])
-            if not pd.isna(row["model-count"]) and row["model-count"] != ""
-            else pd.NA,
-            axis=1,
+            df_total_features,
         )
 
-        print("About halfway done..")
-
-        def unify_solvers(df, columns=['model-count-unconstrained-log10']):
-            return df[['revision', 'committer_date', 'architecture', 'extractor', *columns]].drop_duplicates()
-
-        def big_sum(series):
-            big_sum = sum([int(value)
-                          for value in series if not pd.isna(value) and value])
-            if big_sum > 0:
-                return len(str(big_sum))
-
-        def evaluate_metric(df, extractor, x_value, x, y):
-            rows = df[(df['extractor'] == extractor) & (
-                df[x] >= x_value)].sort_values(by=x)
-            if len(rows) > 0:
-                return rows[rows[x] == rows.iloc[0][x]][y].median()
-
-        def estimate_metric(df, x, y, extractor, key=lambda x: x.timestamp()):
-            df_all = df[(df['extractor'] == extractor)].sort_values(
-                by=x).dropna(subset=[y])
-            if len(df_all) < 3:
-                return []
-            df_all['kind'] = 'actual'
-            mid = len(df_all) * -1 // 2 * -1
-            df_train = df_all[0:mid]
-            df_test = df_all[mid:]
-            fig = px.scatter(
-                df_train,
-                x=x,
-                y=y,
-                trendline='ols'
-            )
-            xs = list(df_test[x])
-            a = estimate_trend(fig, xs=xs, key=key)
-            estimated_values = a[4]
-            deviations = []
-            for (x_value, estimated_value) in zip(xs, estimated_values):
-                actual_value = evaluate_metric(df, extractor, x_value, x, y)
-                deviation = estimated_value / actual_value - 1
-                deviations.append(deviation)
-            return deviations
-
-        self.df_solve_slice = self.df_solve_unconstrained[self.df_solve_unconstrained['year'] <= 2013]
-        self.df_solve_failures = self.df_solve_slice.groupby(['extractor', 'revision', 'architecture'], dropna=False).agg(
+    @derived("df_solve", "df_features")
+    def df_solve_unconstrained(self):
+        df = self.df_solve.merge(self.df_features)
+        # exact counts (model-count-unconstrained) are only needed for the summed slice, see df_solve_slice
+        df["model-count-unconstrained-log10"] = unconstrained_model_count_log10(
+            df).replace(0, np.nan)
+        df["similarity"] = unconstrained_similarity(df)
+        return df
+
+    @derived("df_solve_unconstrained")
+    def df_solve_slice(self):
+        df = self.df_solve_unconstrained[self.df_solve_unconstrained['year'] <= 2013].copy()
+        df["model-count-unconstrained"] = unconstrained_model_count(df)
+        check_unconstrained_model_count(df)
+        return df
+
+    @derived("df_solve_slice")
+    def df_solve_failures(self):
+        df = self.df_solve_slice.groupby(['extractor', 'revision', 'architecture'], dropna=False, observed=True).agg(
             {'model-count-unconstrained-log10': lambda x: (True in list(pd.notna(x)) or pd.NA)}).reset_index()
-        self.df_solve_group = self.df_solve_failures.groupby(
-            ['extractor', 'revision'], dropna=False)
-        self.df_solve_failures = (self.df_solve_group['model-count-unconstrained-log10'].size(
-        ) - self.df_solve_group['model-count-unconstrained-log10'].count()).reset_index()
-        self.df_solve_failures['is-upper-bound'] = self.df_solve_failures['model-count-unconstrained-log10'] == 0
-        self.df_solve_failures = self.df_solve_failures.rename(
-            columns={'model-count-unconstrained-log10': 'failures'})
-        self.df_solve_total = unify_solvers(pd.merge(self.df_solve_slice, self.df_solve_failures), [
-                                            'model-count-unconstrained', 'model-count-unconstrained-log10', 'is-upper-bound', 'failures', 'year'])
-        self.df_solve_total = self.df_solve_total.groupby(['extractor', 'committer_date', 'year']).agg(
-            {'model-count-unconstrained': big_sum, 'is-upper-bound': 'min', 'failures': 'min'}).reset_index()
-
-        self.df_features_and_configurations = pd.merge(
+        group = df.groupby(['extractor', 'revision'], dropna=False, observed=True)
+        df = (group['model-count-unconstrained-log10'].size(
+        ) - group['model-count-unconstrained-log10'].count()).reset_index()
+        df['is-upper-bound'] = df['model-count-unconstrained-log10'] == 0
+        return df.rename(columns={'model-count-unconstrained-log10': 'failures'})
+
+    @derived("df_solve_slice", "df_solve_failures")
+    def df_solve_total(self):
+        df = unify_solvers(pd.merge(self.df_solve_slice, self.df_solve_failures), [
+            'model-count-unconstrained', 'model-count-unconstrained-log10', 'is-upper-bound', 'failures', 'year'])
+        keys = ['extractor', 'committer_date', 'year']
+        totals = big_sum_groups(df, keys, 'model-count-unconstrained')
+        return pd.concat([totals['digits'].rename('model-count-unconstrained'), df.groupby(keys, observed=True).agg(
+            {'is-upper-bound': 'min', 'failures': 'min'})], axis=1).reset_index()
+
+    @derived("df_features", "df_solve_unconstrained")
+    def df_features_and_configurations(self):
+        df = pd.merge(
             self.df_features, unify_solvers(self.df_solve_unconstrained))
-        self.df_features_and_configurations = self.df_features_and_configurations[
-            ~self.df_features_and_configurations['model-count-unconstrained-log10'].isna()]
-        self.df_features_and_configurations_total = pd.merge(self.df_features.drop(
+        return df[~df['model-count-unconstrained-log10'].isna()]
+
+    @derived("df_features", "df_solve_total")
+    def df_features_and_configurations_total(self):
+        df = pd.merge(self.df_features.drop(
             columns=['#features']).drop_duplicates(), self.df_solve_total)
-        self.df_features_and_configurations_total = self.df_features_and_configurations_total[~self.df_features_and_configurations_total[
-            'model-count-unconstrained'].isna() & self.df_features_and_configurations_total['is-upper-bound']]
-        self.df_features_and_configurations_total.rename(
-            columns={'#total_features': '#features', 'model-count-unconstrained': 'model-count-unconstrained-log10'}, inplace=True)
-        self.df_features_and_configurations_total['architecture'] = 'TOTAL'
-        self.df_features_and_configurations_total = self.df_features_and_configurations_total[[
+        df = df[~df['model-count-unconstrained'].isna() & df['is-upper-bound']]
+        df = df.rename(
+            columns={'#total_features': '#features', 'model-count-unconstrained': 'model-count-unconstrained-log10'})
+        df['architecture'] = 'TOTAL'
+        return df[[
             '#features', 'model-count-unconstrained-log10', 'extractor', 'revision', 'architecture']].drop_duplicates().dropna()
-        self.df_features_and_configurations_scatter = self.df_features_and_configurations[[
+
+    @derived("df_features_and_configurations", "df_features_and_configurations_total")
+    def df_features_and_configurations_scatter(self):
+        df = self.df_features_and_configurations[[
             '#features', 'model-count-unconstrained-log10', 'extractor', 'revision', 'architecture']]
-        self.df_features_and_configurations_scatter = pd.concat(
-            [self.df_features_and_configurations_scatter, self.df_features_and_configurations_total])
+        return pd.concat(
+            [df, self.df_features_and_configurations_total])
 
-        self.df_solve_total_exact = self.df_solve_total.copy().sort_values(by='committer_date')
-        self.df_solve_total_exact = self.df_solve_total_exact[
-            self.df_solve_total_exact['is-upper-bound']]
-        self.df_solve_unconstrained_unified = unify_solvers(
+    @derived("df_solve_total")
+    def df_solve_total_exact(self):
+        df = self.df_solve_total.copy().sort_values(by='committer_date')
+        return df[df['is-upper-bound']]
+
+    @derived("df_solve_unconstrained")
+    def df_solve_unconstrained_unified(self):
+        return unify_solvers(
             self.df_solve_unconstrained).copy().sort_values(by='committer_date')
 
-        deviations = []
+    @derived("df_solve_total_exact")
+    def df_solve_total_diff(self):
+        # change of the total #configurations between consecutive revisions, per extractor
+        df = self.df_solve_total_exact
+        return df.assign(**{'model-count-unconstrained': df.groupby('extractor', observed=True)[
+            'model-count-unconstrained'].diff()})
+
+    @derived("df_solve_unconstrained_unified")
+    def df_solve_unconstrained_diff(self):
+        # change of the #configurations between consecutive revisions, per architecture and extractor
+        df = self.df_solve_unconstrained_unified
+        return df.assign(**{'model-count-unconstrained-log10': df.groupby(['architecture', 'extractor'], observed=True)[
+            'model-count-unconstrained-log10'].diff()})
+
+    @derived("df_total_features", "df_features", "df_solve_total_exact", "df_solve_unconstrained_unified",
+             "df_features_and_configurations_total", "df_features_and_configurations")
+    def deviations(self):
+        groups = []
         for extractor in ['KConfigReader', 'KClause']:
-            for (df, metric, x, column, arch, key) in \
-                [(self.df_total_features, 'features', 'committer_date', '#total_features', 'TOTAL', None)] + \
-                [(self.df_features[self.df_features['architecture'] == arch], 'features', 'committer_date', '#features', arch, None) for arch in set(self.df_features['architecture'].drop_duplicates())] + \
-                [(self.df_solve_total_exact, 'configurations', 'committer_date', 'model-count-unconstrained', 'TOTAL', None)] + \
-                [(self.df_solve_unconstrained_unified[self.df_solve_unconstrained_unified['architecture'] == arch], 'configurations', 'committer_date', 'model-count-unconstrained-log10', arch, None) for arch in set(self.df_solve_unconstrained_unified['architecture'].drop_duplicates())] + \
-                [(self.df_features_and_configurations_total, 'configurations-by-features', '#features', 'model-count-unconstrained-log10', 'TOTAL', lambda x: x)] + \
-                    [(self.df_features_and_configurations[self.df_features_and_configurations['architecture'] == arch], 'configurations-by-features', '#features', 'model-count-unconstrained-log10', arch, lambda x: x) for arch in set(self.df_features_and_configurations['architecture'].drop_duplicates())]:
-                current_deviations = estimate_metric(
-                    df, x, column, extractor, key if key is not None else lambda x: x.timestamp())
-                deviations.extend([{'extractor': extractor, 'architecture': arch, 'deviation': deviation,
-                                  'is-total': arch == 'TOTAL', 'metric': metric} for deviation in current_deviations])
-        self.deviations = pd.DataFrame(deviations)
-        self.deviations.replace(
+            for (df, metric, x, column, arch) in \
+                [(self.df_total_features, 'features', 'committer_date', '#total_features', 'TOTAL')] + \
+                [(self.df_features[self.df_features['architecture'] == arch], 'features', 'committer_date', '#features', arch) for arch in sorted(set(self.df_features['architecture'].drop_duplicates()))] + \
+                [(self.df_solve_total_exact, 'configurations', 'committer_date', 'model-count-unconstrained', 'TOTAL')] + \
+                [(self.df_solve_unconstrained_unified[self.df_solve_unconstrained_unified['architecture'] == arch], 'configurations', 'committer_date', 'model-count-unconstrained-log10', arch) for arch in sorted(set(self.df_solve_unconstrained_unified['architecture'].drop_duplicates()))] + \
+                [(self.df_features_and_configurations_total, 'configurations-by-features', '#features', 'model-count-unconstrained-log10', 'TOTAL')] + \
+                    [(self.df_features_and_configurations[self.df_features_and_configurations['architecture'] == arch], 'configurations-by-features', '#features', 'model-count-unconstrained-log10', arch) for arch in sorted(set(self.df_features_and_configurations['architecture'].drop_duplicates()))]:
+                groups.append(((df, x, column, extractor), {'extractor': extractor, 'architecture': arch,
+                                                            'is-total': arch == 'TOTAL', 'metric': metric}))
+        columns = ['extractor', 'architecture', 'deviation', 'is-total', 'metric']
+        if self.backtest is None:
+            estimates = estimate_metrics([group for group, _ in groups])
+        else:
+            # backtests need dates, so the configurations by features are still split in half
+            dated = np.array([i for i, ((df, x, _, _), _) in enumerate(groups)
+                              if pd.api.types.is_datetime64_any_dtype(df[x])], dtype=int)
+            others = np.setdiff1d(np.arange(len(groups)), dated)
+            backtests = backtest_metrics([groups[i][0] for i in dated], jobs=self.jobs, **self.backtest)
+            splits = estimate_metrics([groups[i][0] for i in others])
+            estimates = pd.concat([
+                backtests.assign(group=dated[backtests['group'].to_numpy()], horizon=backtests['horizon'].map(
+                    lambda horizon: f"{horizon:g} year{'' if horizon == 1 else 's'}")),
+                splits.assign(group=others[splits['group'].to_numpy()], horizon='50/50 split')
+            ], ignore_index=True).sort_values('group', kind='stable')
+            columns.append('horizon')
+        labels = pd.DataFrame([label for _, label in groups])
+        deviations = labels.reindex(estimates['group']).reset_index(drop=True).assign(
+            **{column: estimates[column].to_numpy() for column in ['deviation', 'horizon'] if column in estimates})[columns]
+        deviations.replace(
             {'extractor': {'KConfigReader': 'KCR', 'KClause': 'KCl'}}, inplace=True)
-        self.deviations.replace(
+        deviations.replace(
             {'is-total': {True: 'Total', False: 'Per Arch.'}}, inplace=True)
-
-        self.keymap = {
-            "#total_features": "total-features",
-            "#features": "features",
-            "backbone.dimacs-analyzer-time": "model-count-time",
-            "model-count-unconstrained-log10": "model-count",
-            "model-count-unconstrained": "model-count",
-            "source_lines_of_code": "source_lines_of_code"
-        }
-        self.metrics = {f"linux/{arch}": dict()
-                        for arch in self.df_kconfig["architecture"].unique()}
-        self.metrics["linux/all"] = dict()
-        # self.generate_figures()
-        self.generate_metrics()
+        return deviations
+
+    def partition(self, name):
+        """the given dataframe split by architecture, computed once so that each figure takes its slice in O(1)"""
+        if name not in self.partitions:
+            self.partitions[name] = ArchitecturePartition(getattr(self, name))
+        return self.partitions[name]
+
+    def input(self, name):
+        if name not in self.inputs:
+            self.inputs[name] = self.read_input(name)
+        return self.inputs[name]
+
+    def read_input(self, name):
+        if name == "linux-features.dat":
+            return self.read_pickle(name)
+        if name == "model-count-with-6h-timeout":
+            path = f"{self.output_directory}/{name}.csv"
+            return read_csv_cached(path, self.cache_directory, dtype={'model-count': 'string'}) if os.path.isfile(path) else None
+        stage, _, file = name.partition("/")
+        return self.read_dataframe(stage, {"model-count": "string"} if stage == "solve_model-count" else {}, file=file or None)
+
+    def load_dataframes(self, names, workers=None):
+        """reads the given inputs concurrently, as they are independent of each other"""
+        names = [name for name in names if name not in self.inputs]
+        if not names:
+            return
+        durations = dict()
+
+        def timed(name):
+            start = time.perf_counter()
+            result = self.read_input(name)
+            durations[name] = time.perf_counter() - start
+            return result
+
+        workers = workers or min(len(names), (os.cpu_count() or 1) + 4)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(timed, name) for name in names}
+            for name, future in futures.items():
+                self.inputs[name] = future.result()
+        # the read times of concurrent inputs include waiting for each other, so they do not add up to a serial load
+        print(f"Loaded {len(names)} inputs in {time.perf_counter() - start:.2f}s with {workers} workers")
+        for name, duration in sorted(durations.items(), key=lambda item: -item[1]):
+            print(f"  {name}: {duration:.2f}s")
+
+    def input_path(self, name):
+        if name == "linux-features.dat":
+            return f"{self.output_directory}/{name}"
+        if name == "model-count-with-6h-timeout":
+            return f"{self.output_directory}/{name}.csv"
+        stage, _, file = name.partition("/")
+        return f"{self.output_directory}/{stage}/{file or 'output'}.csv"
+
+    def step_inputs(self, dataframes, *settings):
+        """digest of the input files the given dataframes are computed from and of settings affecting the step"""
+        _, inputs = self.dependencies(*dataframes)
+        return digest([{name: self.build.file_digest(self.input_path(name)) for name in sorted(inputs)},
+                       self.config["linux"].get("stage_schemas", True), *settings])
+
+    def read_pickle(self, file):
+        with open(f"{self.output_directory}/{file}", "rb") as f:
+            return pickle.load(f)
 
     def read_dataframe(self, stage, dtype={}, usecols=None, file=None):
         if not file:
             file = "output"
-        df = pd.read_csv(
-            f"{self.output_directory}/{stage}/{file}.csv", dtype=dtype, usecols=usecols
+        options = stage_read_options(stage, "linux") if self.config["linux"].get(
+            "stage_schemas", True) else {"dtype": dict(), "usecols": None}
+        df = read_csv_cached(
+            f"{self.output_directory}/{stage}/{file}.csv", self.cache_directory,
+            dtype=options["dtype"] | dtype, usecols=usecols or options["usecols"]
         )
         if "committer_date_unix" in df:
-            df["committer_date"] = df["committer_date_unix"].apply(
-                lambda d: pd.to_datetime(d, unit="s")
-            )
+            df["committer_date"] = pd.to_datetime(df["committer_date_unix"], unit="s")
         return df
 
     def solver_successes(self, solver):
@@ -323,61 +584,49 @@ class Linux:
     def filter_for_architecture(self, df, arch):
         return df[df["architecture"] == arch]
 
-    def differentiate_extractors(self, arch, df, sortBy, key, prefix, unit, apply_func=None):
-        """returns: {
-            "extractor1": {
-                "value": "<prefix><value1> <unit>",
-                "date": "From <date1>"},
-            "extractor2": {
-                "value": "<prefix><value2> <unit>",
-                "date": "From <date2>"
+    def differentiate_extractors(self, df, sortBy, key, prefix, unit, apply_func=None, by_architecture=True):
+        """returns, for each architecture in df (or for df as a whole, under "all", if not by_architecture): {
+            "currentValue": {
+                "extractor1": {
+                    "currentValue": {
+                        "value": "<prefix><value1> <unit>",
+                        "date": "From <date1>"},
+                    "history": {...}
+                },
+                "extractor2": ...
             }
-        """
-        vals = {"currentValue": dict()}
-        for extractor in df["extractor"].unique():
-            history = {"history": dict()}
-            df_ex = df[df["extractor"] == extractor]
-            if df_ex.empty:
-                print(key, df["extractor"].unique(), extractor)
-            ex_value = df_ex.dropna().sort_values(sortBy).last_valid_index()
-            if ex_value not in df_ex.index:
-                vals["currentValue"][extractor] = {
+        }"""
+        by = ["architecture", "extractor"] if by_architecture else ["extractor"]
+        # the latest value and history of all architectures and extractors at once
+        latest = latest_observations(df, by, sortBy)
+        histories = {group: history for group, history in
+                     lookup_history(df, key, latest, by=by, **self.history).groupby(by, sort=False)}
+        latest = {tuple(row[column] for column in by): row for row in latest.to_dict("records")}
+        vals = dict()
+        for group in df[by].drop_duplicates().dropna().astype(object).itertuples(index=False, name=None):
+            arch, extractor = group if by_architecture else ("all", *group)
+            vals.setdefault(arch, {"currentValue": dict()})
+            if group not in latest:
+                vals[arch]["currentValue"][extractor] = {
                     "currentValue": {
                         "value": f"0 {unit}",
                         "date": f"Date not Found"
                     },
-                    "history": history["history"]
+                    "history": dict()
                 }
                 continue
-            ex_value = df_ex.loc[ex_value]
-            date = "Date not Found"
-            date_prefix = ""
-            if not ex_value.empty:
-                date = ex_value["committer_date"]
-                history = self.try_history(
-                    arch=arch,
-                    df=df_ex,
-                    last_date=date,
-                    key=key,
-                    unit=unit,
-                    prefix=prefix,
-                    apply_func=apply_func,
-                    last_value=ex_value[key],
-                    date_func=lambda ym: df_ex["committer_date"].dt.strftime(
-                        "%Y") == ym.strftime("%Y")
-                )
-                date = date.strftime("%B %d, %Y")
-                date_prefix = "From"
-                if apply_func:
-                    ex_value = apply_func(ex_value[key])
-            else:
-                ex_value = 0
-                prefix = ""
-
-            vals["currentValue"][extractor] = {
+            ex_value = latest[group]
+            history = histories.get(group)
+            history = history_entries(history, key, unit, prefix, apply_func, skip_zero=True) \
+                if history is not None else dict()
+            date = ex_value["committer_date"].strftime("%B %d, %Y")
+            ex_value = ex_value[key]
+            if apply_func:
+                ex_value = apply_func(ex_value)
+            vals[arch]["currentValue"][extractor] = {
                 "currentValue": {
                     "value": f"{prefix}{ex_value} {unit}",
-                    "date": f"{date_prefix} {date}"
+                    "date": f"From {date}"
                 },
                 "history": history
             }
@@ -385,77 +634,89 @@ class Linux:
 
     def model_count_time_latest(self):
         archs = list(self.df_kconfig["architecture"].unique())
+        extractor_values = self.differentiate_extractors(
+            df=self.df_solve_slice, sortBy="committer_date_unix", key="backbone.dimacs-analyzer-time", prefix="10^",
+            unit="s", apply_func=lambda v: int(v)//1000000000)
         for arch in archs:
-            df_arch = self.df_solve_slice[self.df_solve_slice["architecture"] == arch]
-            key = "backbone.dimacs-analyzer-time"
-            extractor_values = self.differentiate_extractors(
-                arch=arch, df=df_arch, sortBy="committer_date_unix", key=key, prefix="10^", unit="s", apply_func=lambda v: int(v)//1000000000)
-            self.metrics[f"linux/{arch}"]["model-count-time"] = extractor_values
+            self.metrics[f"linux/{arch}"]["model-count-time"] = extractor_values.get(arch, {"currentValue": dict()})
 
     def model_count_latest(self):
         archs = list(self.df_kconfig["architecture"].unique())
         archs.append("all")
+        extractor_values = self.differentiate_extractors(
+            df=self.df_solve_slice, sortBy="committer_date_unix", key="model-count-unconstrained-log10", prefix="10^",
+            unit="models", apply_func=lambda v: int(v))
+        extractor_values |= self.differentiate_extractors(
+            df=self.df_solve_total, sortBy="committer_date", key="model-count-unconstrained", prefix="10^",
+            unit="models", apply_func=lambda v: int(v), by_architecture=False)
         for arch in archs:
-            df_arch = self.df_solve_slice[self.df_solve_slice["architecture"] == arch]
-            key = "model-count-unconstrained-log10"
-            sortBy = "committer_date_unix"
-            if arch == 'all':
-                df_arch = self.df_solve_total
-                key = "model-count-unconstrained"
-                sortBy = "committer_date"
-            extractor_values = self.differentiate_extractors(
-                arch=arch, df=df_arch, sortBy=sortBy, key=key, prefix="10^", unit="models", apply_func=lambda v: int(v))
-            self.metrics[f"linux/{arch}"]["model-count"] = extractor_values
-
-    def generate_metrics(self):
-        print(f"Generating linux metrics & merging into src/public/init.json")
-        self.total_features_latest()
-        self.features_latest()
-        self.sloc_latest()
-        self.model_count_latest()
-        self.model_count_time_latest()
+            self.metrics[f"linux/{arch}"]["model-count"] = extractor_values.get(arch, {"currentValue": dict()})
+
+    def generate_metrics(self, init_json_path="src/public/init.json"):
+        print(f"Generating linux metrics & merging into {init_json_path}")
+        project_data = read_project_data(init_json_path)
+        def exists(entry):
+            project, _, metric = entry.rpartition("/")
+            return metric in project_data.get(project, dict())
+        inputs = {metric: self.step_inputs(dataframes, self.history) for metric, dataframes in self.METRICS.items()}
+        pending = [metric for metric in self.METRICS
+                   if not self.build.is_current("projectData", f"linux/{metric}", inputs[metric], exists)]
+        self.build.report("projectData", "linux metric")
+        if not pending:
+            # still updates the figure format and files, which depend on the figures generated before
+            merge_metrics(dict(), init_json_path)
+            return
+        self.prepare(*[dataframe for metric in pending for dataframe in self.METRICS[metric]])
+        self.metrics = {f"linux/{arch}": dict()
+                        for arch in self.df_kconfig["architecture"].unique()}
+        self.metrics["linux/all"] = dict()
+        functions = {
+            "total-features": self.total_features_latest,
+            "features": self.features_latest,
+            "source_lines_of_code": self.sloc_latest,
+            "model-count": self.model_count_latest,
+            "model-count-time": self.model_count_time_latest,
+        }
+        for metric in pending:
+            functions[metric]()
         print(self.metrics)
-        merge_metrics(self.metrics)
+        project_data = merge_metrics(self.metrics, init_json_path)["projectData"]
+        for metric in pending:
+            self.build.record("projectData", f"linux/{metric}", inputs[metric],
+                              [f"{project}/{metric}" for project in self.metrics if metric in project_data.get(project, dict())],
+                              exists)
+        self.build.save()
 
     def total_features_latest(self):
         extractor_values = self.differentiate_extractors(
-            arch="all", df=self.df_total_features, sortBy="committer_date", key="#total_features", prefix="", unit="features", apply_func=lambda v: int(v))
-        self.metrics["linux/all"]["total-features"] = extractor_values
+            df=self.df_total_features, sortBy="committer_date", key="#total_features", prefix="", unit="features",
+            apply_func=lambda v: int(v), by_architecture=False)
+        self.metrics["linux/all"]["total-features"] = extractor_values.get("all", {"currentValue": dict()})
 
     def features_latest(self):
         archs = list(self.df_kconfig["architecture"].unique())
+        extractor_values = self.differentiate_extractors(
+            df=self.df_features, sortBy="committer_date", key="#features", prefix="", unit="features",
+            apply_func=lambda v: int(v))
         for architecture in archs:
-            df = self.filter_for_architecture(self.df_features, architecture)
-            extractor_values = self.differentiate_extractors(
-                arch=architecture, df=df, sortBy="committer_date", key="#features", prefix="", unit="features", apply_func=lambda v: int(v))
-            self.metrics[f"linux/{architecture}"]["features"] = extractor_values
+            self.metrics[f"linux/{architecture}"]["features"] = extractor_values.get(
+                architecture, {"currentValue": dict()})
 
     def sloc_latest(self):
         archs = list(self.df_kconfig["architecture"].unique())
         archs.append("all")
         key = "source_lines_of_code"
+        df = self.df_kconfig.sort_values(by="committer_date_unix", kind="stable")
+        latest = df.groupby("architecture", observed=True).tail(1).set_index("architecture", drop=False)
+        # the history of all architectures at once, and of "all" across architectures
+        history = lookup_history(df, key, latest, by=["architecture"], **self.history)
+        history = dict(list(history.groupby("architecture"))) | {"all": lookup_history(df, key, df.tail(1), **self.history)}
         for arch in archs:
-            history = {"history": dict()}
+            value = df.tail(1) if arch == "all" else latest.loc[[arch]]
             date = "Date not Found"
             date_prefix = ""
-            df_arch = self.filter_for_architecture(self.df_kconfig, arch)
-            if arch == "all":
-                df_arch = self.df_kconfig
-            value = df_arch.sort_values(by="committer_date_unix").tail(1)
             if not value.empty:
                 date = pd.to_datetime(value["committer_date_readable"]).iloc[0]
-                history = self.try_history(
-                    arch=arch,
-                    df=df_arch,
-                    last_date=date,
-                    key=key,
-                    unit="loc",
-                    prefix="",
-                    apply_func=lambda x: int(x),
-                    last_value=value.iloc[0][key],
-                    date_func=lambda ym: df_arch["committer_date_readable"].str.contains(
-                        ym.strftime("%Y-%m"))
-                )
                 date = date.strftime("%B %d, %Y")
                 date_prefix = "From"
                 value = int(value.iloc[0][key])
@@ -466,74 +727,101 @@ class Linux:
                     "value": f"{value} loc",
                     "date": f"{date_prefix} {date}"
                 },
-                "history": history
+                "history": history_entries(history[arch], key, "loc", "", lambda x: int(x), skip_zero=True)
+                if arch in history else dict()
             }
 
-    def try_history(self, arch, df, last_date, key, unit, prefix, last_value, date_func, apply_func=None, ):
-        history = [1, 2, 5, 10]
-        if key not in self.metrics[f"linux/{arch}"]:
-            self.metrics[f"linux/{arch}"][self.keymap[key]] = {}
-        self.metrics[f"linux/{arch}"][self.keymap[key]]["history"] = dict()
-        history_vals = dict()
-        for last in history:
-            ym = last_date - pd.Timedelta(last*365, "d")
-            value = df[date_func(ym)].tail(1)
-            if value.empty:
-                ym = ym - pd.Timedelta(30, "d")
-                value = df[date_func(ym)].tail(1)
-            if value.empty:
-                ym = ym + pd.Timedelta(30, "d")
-                value = df[date_func(ym)].tail(1)
-            if value.empty:
-                value = df[date_func(ym)].tail(1)
-            if value.empty:
-                continue
-            value = value.iloc[0].replace(pd.NA, np.nan)[key]
-            if np.isnan(value):
-                continue
-            if apply_func:
-                last_value = apply_func(last_value)
-                value = apply_func(value)
-            if value != 0:
-                history_vals[f"{last}-years-before"] = {
-                    "value": f"{prefix}{value} {unit}",
-                    "date": ym.strftime("%B %d, %Y")
-                }
-        return history_vals
-
-    def generate_figures(self):
+    def generate_figures(self, jobs=1):
         print(f"Generating linux plots & Saving to {self.figures_directory}")
-        for arch in (pbar := tqdm(self.architectures)):
-            pbar.set_description(f"Processing {arch}")
-            configuration_evolution(
-                self.df_solve_total, self.df_solve_unconstrained_unified, arch, self.figures_directory)
-            configuration_similarity(
-                self.df_solve_unconstrained, arch, self.figures_directory)
-            feature_evolution(self.df_features, arch, self.figures_directory)
-            if arch != "all":
-                features(self.df_features, arch, self.figures_directory)
-            jaccard_similarity(self.df_features, arch, self.figures_directory)
-            model_count(self.df_solve_total, self.df_solve_slice,
-                        arch, self.figures_directory)
-            model_count_time(self.df_solve, arch, self.figures_directory)
-            prediction_accuracies(self.deviations, arch,
-                                  self.figures_directory)
-            share_of_feature_variables(
-                self.df_solve_unconstrained, arch, self.figures_directory)
-            sloc(self.df_kconfig, arch, self.figures_directory)
-            if arch == "all":
-                total_features(self.df_features, self.figures_directory)
-
-
-def linux_main(config: str):
-    Linux(config)
+        self.prepare("architectures")
+        inputs = {figure: self.step_inputs(dataframes, FIGURE_OPTIONS, *(
+            [self.backtest] if self.backtest and "deviations" in dataframes else [])) for figure, dataframes in self.FIGURES.items()}
+        pending = {arch: [figure for figure in self.FIGURES
+                          if not self.build.is_current("figures", f"{figure}-linux-{arch}", inputs[figure])]
+                   for arch in self.architectures}
+        pending = {arch: figures for arch, figures in pending.items() if figures}
+        self.build.report("figures", "linux figure")
+        dataframes = sorted({dataframe for figures in pending.values()
+                             for figure in figures for dataframe in self.FIGURES[figure]})
+        self.prepare(*dataframes)
+        for name in dataframes:
+            # compute (and partition, unless plotted as a whole) the dataframes before forking, so that the workers share them
+            if "architecture" in getattr(self, name):
+                self.partition(name)
+        start = time.perf_counter()
+        if jobs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+            print("Generating linux plots serially, as parallel generation requires fork.")
+            jobs = 1
+        if jobs > 1:
+            global _figures_linux
+            _figures_linux = self
+            try:
+                with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+                    futures = [executor.submit(_generate_architecture_figures, arch, figures)
+                               for arch, figures in pending.items()]
+                    for future in (pbar := tqdm(as_completed(futures), total=len(futures))):
+                        arch, outputs, stats = future.result()
+                        add_write_stats(stats)
+                        self.record_figures(arch, outputs, inputs)
+                        pbar.set_description(f"Processed {arch}")
+            finally:
+                _figures_linux = None
+        else:
+            for arch, figures in (pbar := tqdm(pending.items())):
+                pbar.set_description(f"Processing {arch}")
+                self.record_figures(arch, self.generate_architecture_figures(arch, figures), inputs)
+        self.build.save()
+        print(f"Generated linux plots for {len(pending)} architectures in "
+              f"{time.perf_counter() - start:.2f}s with {jobs} processes")
+        report_writes("linux figure")
+
+    def record_figures(self, arch, outputs, inputs):
+        for figure, paths in outputs.items():
+            self.build.record("figures", f"{figure}-linux-{arch}", inputs[figure], paths)
+
+    def generate_architecture_figures(self, arch, figures=None):
+        """plots the given figures (by default, all) of an architecture and returns the files written per figure"""
+        outputs = dict()
+        for figure in figures or self.FIGURES:
+            written = len(written_figures())
+            self.plot_figure(figure, arch)
+            outputs[figure] = written_figures(written)
+        return outputs
+
+    def plot_figure(self, figure, arch):
+        partition, directory = self.partition, self.figures_directory
+        plots = {
+            "configuration-evolution": lambda: configuration_evolution(
+                self.df_solve_total_diff, partition("df_solve_unconstrained_diff"), arch, directory),
+            "configuration-similarity": lambda: configuration_similarity(
+                partition("df_solve_unconstrained"), arch, directory),
+            "feature-evolution": lambda: feature_evolution(partition("df_features"), arch, directory),
+            "features": lambda: arch != "all" and features(partition("df_features"), arch, directory),
+            "jaccard-similarity": lambda: jaccard_similarity(partition("df_features"), arch, directory),
+            "model-count": lambda: model_count(self.df_solve_total, partition("df_solve_slice"), arch, directory),
+            "model-count-time": lambda: model_count_time(partition("df_solve"), arch, directory),
+            "prediction-accuracy": lambda: prediction_accuracies(partition("deviations"), arch, directory),
+            "share-of-feature-variables": lambda: share_of_feature_variables(
+                partition("df_solve_unconstrained"), arch, directory),
+            "source_lines_of_code": lambda: sloc(partition("df_kconfig"), arch, directory),
+            "total-features": lambda: arch == "all" and total_features(self.df_features, directory),
+        }
+        plots[figure]()
+
+
+def linux_main(config: str, jobs: int = 1, force: bool = False):
+    Linux(config, jobs, force)
 
 
 if __name__ == "__main__":
     # CONFIGURABLE VARIABLES
     parser = ArgumentParser("Linux Figure Generator")
     parser.add_argument("--config", "-c", required=True, type=str)
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="number of processes generating the figures")
+    parser.add_argument("--force", "-f", action="store_true",
+                        help="rebuild all figures and metrics, even if their inputs are unchanged")
     args = parser.parse_args()
     config = args.config if os.path.exists(args.config) else None
     if config:
-        linux_main(config)
+        linux_main(config, args.jobs, args.force)
@@ -8,6 +8,9 @@ import argparse as ap
 import os
 from tqdm import tqdm
 from metrics_helpers import *
+from cache_helpers import read_csv_cached
+from output_helpers import FIGURE_OPTIONS, configure_figures, report_writes, written_figures
+from build_helpers import BuildManifest, digest, source_version
 
 # NONCONFIGURABLE VARIABLES
 init_json_path = "src/public/init.json"  # exact path needed for frontend
@@ -22,8 +25,17 @@ def read_json(path):
 
 
 class NonLinux:
-    def __init__(self, config):
-        self.config = read_json(config).get("nonLinux", dict())
+    VERSION_MODULES = ["gen_figures_nonlinux", "plot_helpers_nonlinux", "metrics_helpers", "output_helpers",
+                       "cache_helpers"]
+
+    def __init__(self, config, force=False):
+        self.config = read_json(config)
+        self.cache_directory = self.config.get("cache_directory", ".cache")
+        configure_figures(self.config)
+        self.history = history_options(self.config)
+        self.build = BuildManifest(self.config.get("build_manifest", ".build-manifest.json"),
+                                   source_version(*self.VERSION_MODULES), force)
+        self.config = self.config.get("nonLinux", dict())
         self.keymap = {
             "source_lines_of_code": "source_lines_of_code",
             "model-features": "total-features",
@@ -42,8 +54,8 @@ class NonLinux:
     def read_dataframe(self, output_directory, stage, file=None):
         if not file:
             file = 'output'
-        df = pd.read_csv(
-            f'{output_directory}/{stage}/{file}.csv')
+        df = read_csv_cached(
+            f'{output_directory}/{stage}/{file}.csv', self.cache_directory, **stage_read_options(stage, "nonlinux"))
         if 'committer_date_unix' in df:
             df['committer_date'] = df['committer_date_unix'].apply(
                 lambda d: pd.to_datetime(d, unit='s'))
@@ -52,6 +64,11 @@ class NonLinux:
     def filter_system(self, df, ignore):
         return df[~df["system"].isin(ignore)]
 
+    def step_inputs(self, config, *settings):
+        """digest of the kconfig stage of a project and of settings affecting the step"""
+        return digest([self.build.file_digest(f'{config["output_directory"]}/kconfig/output.csv'),
+                       config["ignore_systems"], *settings])
+
     def generate_figures(self):
         for project, config in (pbar := tqdm(self.config.items())):
             pbar.set_description(f"Processing {project}")
@@ -60,51 +77,26 @@ class NonLinux:
                 "figures_directory", figures_directory)
             if not os.path.exists(figures_directory):
                 os.mkdir(figures_directory)
+            inputs = self.step_inputs(config, figures_directory, FIGURE_OPTIONS)
+            if self.build.is_current("figures", project, inputs):
+                continue
             self.df = self.filter_system(self.read_dataframe(
                 config["output_directory"], 'kconfig'), ignore=config["ignore_systems"])
             self.df['year'] = self.df['committer_date'].apply(
                 lambda d: int(d.year))
+            written = len(written_figures())
             sloc(self.df, project, output_dir=figures_directory)
             total_features(self.df, project, output_dir=figures_directory)
             model_count(self.df, project, output_dir=figures_directory)
             model_count_time(self.df, project, output_dir=figures_directory)
+            self.build.record("figures", project, inputs, written_figures(written))
+        self.build.save()
+        self.build.report("figures", "non-linux figure")
+        report_writes("non-linux figure")
 
-    def try_history(self, last_date, key, unit, prefix, last_value, apply_func=None, ):
-        history = [1, 2, 5, 10]
-        curyear = last_date.iloc[0]
-        if self.keymap[key] not in self.metrics[self.current_project]:
-            self.metrics[self.current_project][self.keymap[key]] = {}
-        self.metrics[self.current_project][self.keymap[key]]["history"] = dict()
-        history_vals = {"history": dict()}
-        for last in history:
-            ym = curyear - pd.Timedelta(last*365, "d")
-            value = self.df[self.df["committer_date_readable"].str.contains(
-                ym.strftime("%Y-%m"))].tail(1)
-            if value.empty:
-                ym = ym - pd.Timedelta(30, "d")
-                value = self.df[self.df["committer_date_readable"].str.contains(
-                    ym.strftime("%Y-%m"))].tail(1)
-            if value.empty:
-                ym = ym + pd.Timedelta(30, "d")
-                value = self.df[self.df["committer_date_readable"].str.contains(
-                    ym.strftime("%Y-%m"))].tail(1)
-            if value.empty:
-                value = self.df[self.df["committer_date_readable"].str.contains(
-                    ym.strftime("%Y"))].tail(1)
-            if value.empty:
-                continue
-            value = value.iloc[0][key]
-            if apply_func and not np.isnan(value):
-                last_value = apply_func(last_value)
-                value = apply_func(value)
-            else:
-                continue
-
-            history_vals["history"][f"{last}-years-before"] = {
-                "value": f"{prefix}{value} {unit}",
-                "date": ym.strftime("%B %d, %Y")
-            }
-        return history_vals
+    def try_history(self, last_date, key, unit, prefix, apply_func=None):
+        history = lookup_history(self.df, key, pd.DataFrame({"committer_date": [last_date]}), **self.history)
+        return {"history": history_entries(history, key, unit, prefix, apply_func)}
 
     def get_latest_nonLinux(self, key, unit, prefix, apply_func=None):
         date_prefix = ""
@@ -113,8 +105,8 @@ class NonLinux:
         history = {"history": dict()}
         if not value.empty:
             date = pd.to_datetime(value["committer_date_readable"])
-            history = self.try_history(last_date=date, key=key, unit=unit,
-                                    prefix=prefix, apply_func=apply_func, last_value=value.iloc[0][key])
+            history = self.try_history(last_date=value["committer_date"].iloc[0], key=key, unit=unit,
+                                       prefix=prefix, apply_func=apply_func)
             date = date.dt.strftime("%B %d, %Y").iloc[0]
             date_prefix = "From"
             value = value.iloc[0][key]
@@ -129,8 +121,16 @@ class NonLinux:
                 }
 
     def generate_metrics(self):
+        project_data = read_project_data(init_json_path)
+        def exists(entry):
+            project, _, metric = entry.rpartition("/")
+            return metric in project_data.get(project, dict())
+        inputs = dict()
         for project, config in (pbar := tqdm(self.config.items())):
             pbar.set_description(f"Processing {project}")
+            inputs[project] = self.step_inputs(config, self.history)
+            if self.build.is_current("projectData", project, inputs[project], exists):
+                continue
             print(f"Generating metrics for '{project}' and merging into src/public/init.json")
             self.current_project = project
             ignore_systems = config["ignore_systems"]
@@ -145,18 +145,27 @@ class NonLinux:
                 key="model-time", unit="s*10⁹", prefix="", apply_func=lambda v: round(v / 1000000000, 3))
             self.get_latest_nonLinux(
                 key="model-literals", unit="models", prefix="", apply_func=lambda v: int(v))
-        merge_metrics(self.metrics)
+        self.build.report("projectData", "non-linux metric")
+        project_data = merge_metrics(self.metrics, init_json_path)["projectData"]
+        for project, metrics in self.metrics.items():
+            if metrics:
+                self.build.record("projectData", project, inputs[project],
+                                  [f"{project}/{metric}" for metric in metrics if metric in project_data.get(project, dict())],
+                                  exists)
+        self.build.save()
 
 
-def nonlinux_main(config: str):
-    NonLinux(config)
+def nonlinux_main(config: str, force: bool = False):
+    NonLinux(config, force)
 
 
 if __name__ == '__main__':
     # CONFIGURABLE VARIABLES
     parser = ap.ArgumentParser("NonLinux Figure Generator")
     parser.add_argument("--config", "-c", type=str, required=True)
+    parser.add_argument("--force", "-f", action="store_true",
+                        help="rebuild all figures and metrics, even if their inputs are unchanged")
     args = parser.parse_args()
     config = args.config if os.path.exists(args.config) else None
     if config:
-        nonlinux_main(config)
+        nonlinux_main(config, args.force)
@@ -1,17 +1,25 @@
 from gen_figures_linux import linux_main
 from gen_figures_nonlinux import nonlinux_main
+from compress_helpers import compress_main
 from argparse import ArgumentParser
 import os
 
 def main(args):
     config = args.config if os.path.exists(args.config) else None
     if config:
-        nonlinux_main(config)
-        linux_main(config)
+        nonlinux_main(config, args.force)
+        linux_main(config, args.jobs, args.force)
+        compress_main(config, args.compress)
     
 
 if __name__ == "__main__":
     parser = ArgumentParser("Torte Dashboard Preprocessing")
     parser.add_argument("--config", "-c", type=str, required=True)
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="number of processes generating the linux figures")
+    parser.add_argument("--force", "-f", action="store_true",
+                        help="rebuild all figures and metrics, even if their inputs are unchanged")
+    parser.add_argument("--compress", action="store_true",
+                        help="write .gz and .br siblings of the figures and init.json, even if not configured")
     args = parser.parse_args()
     main(args)
\ No newline at end of file
@@ -4,42 +4,280 @@ import os
 import json
 import pickle
 from math import log10
+from output_helpers import FIGURE_OPTIONS, PLOTLYJS_FILE, figure_exists, figure_file, plotlyjs_file, write_if_changed
 
 
 # METRIC GENERATION UTILITY FUNCTIONS
 
 
+EXTRACTOR_NAMES = {"kconfigreader": "KConfigReader", "kmax": "KClause"}
+
+
 def replace_values(df):
-    df.replace("kconfigreader", "KConfigReader", inplace=True)
-    df.replace("kmax", "KClause", inplace=True)
+    # categorical columns cannot take new values, so their categories are renamed instead
+    for column in df.select_dtypes("category"):
+        categories = df[column].cat.categories
+        renames = {old: new for old, new in EXTRACTOR_NAMES.items() if old in categories}
+        if not renames:
+            continue
+        if any(new in categories for new in renames.values()):
+            df[column] = df[column].astype(object).replace(renames).astype("category")
+        else:
+            df[column] = df[column].cat.rename_categories(renames)
+    for old, new in EXTRACTOR_NAMES.items():
+        df.replace(old, new, inplace=True)
 
 
 def big_log10(str):
     return log10(int(str)) if not pd.isna(str) and str != "" else pd.NA
 
 
+def big_log10_series(series, digits=17):
+    """vectorized big_log10 for a column of decimal strings, without parsing them as integers
+
+    Uses the log10 of the leading digits plus the count of the remaining digits, which agrees with
+    big_log10 up to floating point rounding (about 1e-13 for 400-digit counts). Missing and empty
+    values yield NaN."""
+    values = series.astype("string")
+    valid = (values.notna() & (values != "")).to_numpy(dtype=bool)
+    values = values[valid]
+    result = np.full(len(series), np.nan)
+    result[valid] = np.log10(values.str[:digits].astype(float).to_numpy()) \
+        + np.maximum(values.str.len().to_numpy(dtype=float) - digits, 0)
+    return pd.Series(result, index=series.index)
+
+
 def process_model_count(df_solve):
     df_solve["model-count"] = df_solve["model-count"].replace("1", "")
-    df_solve["model-count-log10"] = (
-        df_solve["model-count"].fillna("").apply(big_log10).replace(0, np.nan)
-    )
+    df_solve["model-count-log10"] = big_log10_series(
+        df_solve["model-count"]).replace(0, np.nan)
     df_solve["year"] = df_solve["committer_date"].apply(lambda d: int(d.year))
 
 
+def as_float(series):
+    # works for object columns holding pd.NA as well as nullable dtypes
+    return series.astype(object).where(series.notna(), np.nan).astype(float)
+
+
+def unconstrained_model_count_log10(df):
+    """log10 of model-count * 2^unconstrained_bools * 3^unconstrained_tristates, computed from model-count-log10
+    without big integer arithmetic; NaN where the model count is missing"""
+    return (as_float(df["model-count-log10"])
+            + as_float(df["unconstrained_bools"]) * log10(2)
+            + as_float(df["unconstrained_tristates"]) * log10(3))
+
+
+def unconstrained_similarity(df):
+    """model-count / (model-count * 2^unconstrained_bools * 3^unconstrained_tristates), computed in the log domain"""
+    return (10 ** -(as_float(df["unconstrained_bools"]) * log10(2) + as_float(df["unconstrained_tristates"]) * log10(3))) \
+        .where(df["model-count-log10"].notna())
+
+
+def unconstrained_model_count(df):
+    """exact model-count * 2^unconstrained_bools * 3^unconstrained_tristates as decimal strings, pd.NA where missing"""
+    return pd.Series([
+        str(int(count) * 2 ** int(bools) * 3 ** int(tristates))
+        if not pd.isna(count) and count != "" else pd.NA
+        for count, bools, tristates in zip(df["model-count"], df["unconstrained_bools"], df["unconstrained_tristates"])
+    ], index=df.index, dtype=object)
+
+
+def check_unconstrained_model_count(df, sample=1000, rtol=1e-12):
+    """compares model-count-unconstrained-log10 against the exact model-count-unconstrained for a sample of rows"""
+    df = df[df["model-count-unconstrained"].notna()]
+    df = df.sample(min(sample, len(df)), random_state=0)
+    exact = df["model-count-unconstrained"].map(big_log10).replace(0, np.nan)
+    approximate = df["model-count-unconstrained-log10"]
+    agrees = np.isclose(as_float(approximate), as_float(exact), rtol=rtol, equal_nan=True)
+    if not agrees.all():
+        print(f"Warning: {(~agrees).sum()} of {len(df)} unconstrained model counts disagree with their exact values, "
+              f"maximum deviation: {np.nanmax(np.abs(as_float(approximate) - as_float(exact)))}")
+    return agrees.all()
+
+
 def unify_solvers(df, columns=['model-count-unconstrained-log10']):
     return df[['revision', 'committer_date', 'architecture', 'extractor', *columns]].drop_duplicates()
 
 
+def exact_sum(series):
+    return sum(int(value) for value in series if not pd.isna(value) and value)
+
+
 def big_sum(series):
-    big_sum = sum([int(value)
-                  for value in series if not pd.isna(value) and value])
+    big_sum = exact_sum(series)
     if big_sum > 0:
         return len(str(big_sum))
 
 
+def big_sum_groups(df, by, column, exact=False, tolerance=1e-9):
+    """sums the decimal strings in column per group, like groupby(by).agg({column: big_sum})
+
+    Returns a frame indexed by the groups with the log10 of each sum ("log10") and its number of digits
+    ("digits", what big_sum returns). Both are computed in one vectorized pass from the log10 of each
+    value, using log-sum-exp. Exact sums are only computed for groups whose log10 is too close to an
+    integer to determine the number of digits, or for all groups as "sum" if exact is set."""
+    frame = df[by].assign(log10=big_log10_series(df[column]))
+    frame["log10"] = frame["log10"].where(np.isfinite(frame["log10"]))
+    groups = frame.groupby(by, observed=True)
+    maximum = groups["log10"].transform("max")
+    frame["scaled"] = np.power(10, frame["log10"] - maximum)
+    totals = groups.agg(maximum=("log10", "max"), scaled=("scaled", "sum"))
+    with np.errstate(divide="ignore"):
+        totals["log10"] = totals["maximum"] + np.log10(totals["scaled"])
+    totals["digits"] = np.floor(totals["log10"]) + 1
+    fraction = totals["log10"] - np.floor(totals["log10"])
+    ambiguous = np.full(len(totals), True) if exact else \
+        ((fraction < tolerance) | (fraction > 1 - tolerance)).to_numpy()
+    if ambiguous.any():
+        group = groups.ngroup()
+        selected = group.isin(np.flatnonzero(ambiguous)).to_numpy()
+        sums = df[column].astype(object)[selected].groupby(group[selected].to_numpy()).agg(exact_sum)
+        sums = sums[sums > 0]
+        position = sums.index.to_numpy(dtype=int)
+        totals.iloc[position, totals.columns.get_loc("digits")] = sums.map(lambda s: len(str(s))).to_numpy()
+        totals.iloc[position, totals.columns.get_loc("log10")] = sums.map(log10).to_numpy()
+        if exact:
+            totals["sum"] = pd.Series(sums.map(str).to_numpy(), index=totals.index[position], dtype="string")
+    totals["digits"] = totals["digits"].astype("Int64")
+    return totals.drop(columns=["maximum", "scaled"])
+
+
+# HISTORY LOOKUP
+# the value of a metric some years before its latest value, shown as its history in the dashboard
+
+
+HISTORY_HORIZONS = [1, 2, 5, 10]  # years before the latest value
+HISTORY_TOLERANCE = 90  # days between the looked up date and the observation closest to it, about one Linux release
+
+
+def history_options(config):
+    """the history settings of the top-level configuration, as keyword arguments for lookup_history"""
+    return {"horizons": config.get("history_horizons", HISTORY_HORIZONS),
+            "tolerance": config.get("history_tolerance", HISTORY_TOLERANCE)}
+
+
+def lookup_history(df, key, latest, by=(), date="committer_date", horizons=HISTORY_HORIZONS,
+                   tolerance=HISTORY_TOLERANCE):
+    """the values of key the given numbers of years before the latest date of each group
+
+    latest has one row per group, with the columns in by and date. For each group and horizon, the valid value
+    observed closest to horizon * 365 days before the latest date is taken, if it was observed within tolerance
+    days. All groups and horizons are looked up in one merge_asof on the observations sorted by date (of equally
+    dated observations, the last one in df is taken). Returns the columns in by, horizon, date (of the
+    observation) and key, in the order of the groups in latest and of horizons."""
+    by = list(by)
+    observations = df.loc[df[key].notna(), by + [date, key]]
+    observations = observations.astype({date: "datetime64[ns]"} | {column: object for column in by})
+    observations = observations.sort_values(date, kind="stable").rename(columns={date: "observed"})
+    targets = latest[by + [date]].reset_index(drop=True).merge(pd.DataFrame({"horizon": list(horizons)}), how="cross")
+    targets = targets.astype({date: "datetime64[ns]"} | {column: object for column in by})
+    targets["target"] = targets[date] - pd.to_timedelta(targets["horizon"] * 365, unit="D")
+    history = pd.merge_asof(targets.reset_index().sort_values("target", kind="stable"), observations,
+                            left_on="target", right_on="observed", by=by or None,
+                            direction="nearest", tolerance=pd.Timedelta(days=tolerance))
+    history = history.dropna(subset=["observed"]).sort_values("index")
+    return history[by + ["horizon", "observed", key]].rename(columns={"observed": date}).reset_index(drop=True)
+
+
+def latest_observations(df, by, sort_key):
+    """the row with the largest sort_key among the rows without missing values of each group, like
+    df[df[by] == group].dropna().sort_values(sort_key, kind="stable").tail(1) for every group, but computed with
+    one idxmax (on the reversed rows, so that of equal sort keys the last row is taken, e.g., of several solvers)"""
+    rows = df.dropna().reset_index(drop=True).iloc[::-1]
+    return rows.loc[rows.groupby(by, observed=True, sort=False)[sort_key].idxmax()]
+
+
+def history_entries(history, key, unit, prefix, apply_func=None, date="committer_date", skip_zero=False):
+    """the history of one group looked up with lookup_history, as shown in the dashboard"""
+    entries = dict()
+    for horizon, observed, value in zip(history["horizon"], history[date], history[key]):
+        if apply_func:
+            value = apply_func(value)
+        if skip_zero and value == 0:
+            continue
+        entries[f"{horizon}-years-before"] = {
+            "value": f"{prefix}{value} {unit}",
+            "date": observed.strftime("%B %d, %Y")
+        }
+    return entries
+
+
+# STAGE SCHEMAS
+# dtypes per torte stage, shared by all consumers of a stage, and the columns each consumer
+# (i.e., "linux" or "nonlinux") needs from it; a missing consumer entry reads all columns
+
+
+KEY_DTYPES = {
+    "system": "category",
+    "revision": "category",
+    "architecture": "category",
+    "extractor": "category",
+    "kconfig-file": "category",
+    "committer_date_unix": "Int64",
+}
+KEY_COLUMNS = list(KEY_DTYPES.keys()) + ["committer_date_readable"]
+
+STAGE_SCHEMAS = {
+    "kconfig": {
+        "dtype": KEY_DTYPES,
+        "columns": {
+            "linux": KEY_COLUMNS + ["source_lines_of_code"],
+            "nonlinux": ["system", "revision", "committer_date_unix", "committer_date_readable",
+                         "source_lines_of_code", "model-features", "model-time", "model-literals"],
+        },
+    },
+    "read-linux-architectures": {
+        "dtype": KEY_DTYPES,
+        "columns": {"linux": KEY_COLUMNS},
+    },
+    "read-linux-configs": {
+        "dtype": KEY_DTYPES,
+    },
+    "model_to_uvl_featureide": {
+        "dtype": KEY_DTYPES,
+    },
+    "model_to_smt_z3": {
+        "dtype": KEY_DTYPES,
+    },
+    "dimacs": {
+        "dtype": KEY_DTYPES,
+    },
+    "backbone-dimacs": {
+        "dtype": KEY_DTYPES,
+    },
+    "solve_model-count": {
+        "dtype": KEY_DTYPES | {"backbone.dimacs-analyzer": "category", "model-count": "string"},
+        "columns": {
+            "linux": KEY_COLUMNS + ["backbone.dimacs-analyzer", "backbone.dimacs-analyzer-time", "model-count"],
+        },
+    },
+}
+
+
+def stage_read_options(stage, consumer):
+    """returns the dtype and usecols arguments for reading a stage CSV with read_csv_cached"""
+    schema = STAGE_SCHEMAS.get(stage, dict())
+    return {
+        "dtype": schema.get("dtype", dict()),
+        "usecols": schema.get("columns", dict()).get(consumer),
+    }
+
+
+def report_memory(frames):
+    total = 0
+    seen = set()
+    for name, df in frames.items():
+        if isinstance(df, pd.DataFrame) and id(df) not in seen:
+            seen.add(id(df))
+            size = df.memory_usage(deep=True).sum()
+            total += size
+            print(f"{name}: {size / 1024 ** 2:.2f} MiB ({len(df)} rows)")
+    print(f"total: {total / 1024 ** 2:.2f} MiB")
+
+
 def write_object_to_file(obj, name):
-    with open(name, "w") as fp:
-        json.dump(obj, fp)
+    # atomically, and only if the content changed, so that e.g. the timestamp of init.json stays as is
+    return write_if_changed(name, json.dumps(obj))
 
 
 def read_json(path):
@@ -111,21 +349,38 @@ LINUX_PLOTCONFIG = {
 }
 
 
+def project_shard(proj):
+    # relative to init.json, named like the project's figures
+    return f"projects/{proj.replace("/", "-")}.json"
+
+
+def read_project_data(init_json_path="src/public/init.json"):
+    """projectData of all projects, read from the shards listed in init.json
+
+    An init.json written before it was sharded still contains the projectData itself. A missing shard yields
+    no metrics, so that they are generated again."""
+    index = read_json(init_json_path)
+    project_data = index.get("projectData", dict())
+    for proj, entry in index.get("projects", dict()).items():
+        path = os.path.join(os.path.dirname(init_json_path), entry["shard"])
+        project_data[proj] = read_json(path) if os.path.exists(path) else dict()
+    return project_data
+
+
 def merge_metrics(new, init_json_path="src/public/init.json"):
     old = read_json(init_json_path)
-    if "projectData" not in old:
-        old["projectData"] = dict()
+    old["projectData"] = read_project_data(init_json_path)
     for proj, metrics in new.items():
         for metric, values in metrics.items():
             for name, value in values.items():
-                path = f"src/public/figures/{metric}/{metric}-{proj.replace("/", "-")}.html"
-                print(path)
-                if not os.path.exists(path):
+                figure = f"{metric}-{proj.replace("/", "-")}"
+                print(f"src/public/figures/{metric}/{figure}")
+                if not figure_exists("src/public/figures", metric, figure):
                     print(f"No plot found for {proj} and {metric}.")
                     continue
                 if proj not in old["projectData"]:
                     if "linux" in proj:
-                        old["projectData"][proj] = {plot: dict() for plot, val in LINUX_PLOTCONFIG.items() if val["plotType"] == "box" and val["allOnly"] == (proj == "linux/all") and os.path.exists(f"src/public/figures/{plot}/{plot}-{proj.replace("/", "-")}.html")}
+                        old["projectData"][proj] = {plot: dict() for plot, val in LINUX_PLOTCONFIG.items() if val["plotType"] == "box" and val["allOnly"] == (proj == "linux/all") and figure_exists("src/public/figures", plot, f"{plot}-{proj.replace("/", "-")}")}
                     else:
                         old["projectData"][proj] = dict()
                 if metric not in old["projectData"][proj]:
@@ -137,4 +392,22 @@ def merge_metrics(new, init_json_path="src/public/init.json"):
                         old["projectData"][proj][metric] = dict()
                 if metric in old["projectData"][proj]:
                     old["projectData"][proj][metric][name] = value
-    write_object_to_file(old, init_json_path)
+    old["figureFormat"] = FIGURE_OPTIONS["figure_format"]
+    if FIGURE_OPTIONS["hashed_figures"]:
+        # maps "<plot>/<plot>-<project>" to the content-hashed file of the figure, see write_figure
+        old["figureFiles"] = {PLOTLYJS_FILE: plotlyjs_file()}
+        for proj, plots in old["projectData"].items():
+            for plot in plots:
+                file = figure_file("src/public/figures", plot, f"{plot}-{proj.replace("/", "-")}")
+                if file is not None:
+                    old["figureFiles"][f"{plot}/{plot}-{proj.replace("/", "-")}"] = file
+    else:
+        old.pop("figureFiles", None)
+    # init.json only lists the projects and their plots, the dashboard fetches the metrics of a project when selected
+    os.makedirs(os.path.join(os.path.dirname(init_json_path), "projects"), exist_ok=True)
+    old["projects"] = dict()
+    for proj, plots in old["projectData"].items():
+        write_object_to_file(plots, os.path.join(os.path.dirname(init_json_path), project_shard(proj)))
+        old["projects"][proj] = {"plots": list(plots), "shard": project_shard(proj)}
+    write_object_to_file({key: value for key, value in old.items() if key != "projectData"}, init_json_path)
+    return old
@@ -0,0 +1,278 @@
+import os
+import re
+import time
+import base64
+import hashlib
+import numpy as np
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+try:
+    import orjson  # noqa: F401 (faster engine for to_json_plotly)
+except ImportError:
+    orjson = None
+
+
+# FIGURE OUTPUT
+# how figures are written, set once per run with configure_figures; forked workers inherit it
+
+
+FIGURE_OPTIONS = {
+    "plotlyjs": "inline",  # "inline" embeds plotly.js into every figure, "shared" references one copy
+    "figure_format": "html",  # "html" for standalone pages, "json" for {data, layout} specs, or "both"
+    "compact_figures": False,  # serialize traces with serialize_figure instead of plotly's defaults
+    "figure_precision": {"x": 6, "y": 6},  # significant digits of non-integer values per axis in compact figures
+    "box_statistics": False,  # write box plots as precomputed quartiles and whiskers instead of all samples
+    "box_outliers": 100,  # maximum number of outliers kept per precomputed box
+    "scatter_webgl_threshold": 1000,  # scatter plots with more points are drawn with WebGL (like plotly express)
+    "scatter_bins": None,  # if set, keep one point per cell of a grid with this many cells per axis in such plots
+    "hashed_figures": False,  # name figure files by a hash of their content, so that they can be cached indefinitely
+}
+FIGURE_FORMATS = {"html": [".html"], "json": [".json"], "both": [".html", ".json"]}
+PLOTLYJS_FILE = "plotly.min.js"
+HASH_LENGTH = 12
+# plotly.js decodes {dtype, bdata} arrays since version 2.28
+TYPED_ARRAYS = tuple(map(int, get_plotlyjs_version().split(".")[:2])) >= (2, 28)
+
+# files written by this process, for the summary printed by report_writes (and the build manifest)
+write_stats = {"files": 0, "bytes": 0, "seconds": 0.0, "unchanged": 0, "figures": {}, "paths": []}
+plotlyjs_written = set()
+
+
+def configure_figures(config):
+    """takes the figure output options from the top-level configuration"""
+    plotlyjs = config.get("plotlyjs", FIGURE_OPTIONS["plotlyjs"])
+    if plotlyjs not in ("inline", "shared"):
+        raise ValueError(f"Unknown plotlyjs mode '{plotlyjs}', expected 'inline' or 'shared'.")
+    FIGURE_OPTIONS["plotlyjs"] = plotlyjs
+    figure_format = config.get("figure_format", FIGURE_OPTIONS["figure_format"])
+    if figure_format not in FIGURE_FORMATS:
+        raise ValueError(f"Unknown figure format '{figure_format}', expected one of {', '.join(FIGURE_FORMATS)}.")
+    FIGURE_OPTIONS["figure_format"] = figure_format
+    FIGURE_OPTIONS["compact_figures"] = config.get("compact_figures", FIGURE_OPTIONS["compact_figures"])
+    FIGURE_OPTIONS["figure_precision"] = FIGURE_OPTIONS["figure_precision"] | config.get("figure_precision", {})
+    FIGURE_OPTIONS["box_statistics"] = config.get("box_statistics", FIGURE_OPTIONS["box_statistics"])
+    FIGURE_OPTIONS["box_outliers"] = config.get("box_outliers", FIGURE_OPTIONS["box_outliers"])
+    FIGURE_OPTIONS["scatter_webgl_threshold"] = config.get(
+        "scatter_webgl_threshold", FIGURE_OPTIONS["scatter_webgl_threshold"])
+    FIGURE_OPTIONS["scatter_bins"] = config.get("scatter_bins", FIGURE_OPTIONS["scatter_bins"])
+    FIGURE_OPTIONS["hashed_figures"] = config.get("hashed_figures", FIGURE_OPTIONS["hashed_figures"])
+
+
+def write_if_changed(path, content):
+    """writes content (str or bytes) to path, unless the file already has this content
+
+    The file is written to a temporary file first and renamed, so that it is never left half-written, and the
+    temporary file is per process, so that parallel workers do not interfere. Returns whether path was written."""
+    data = content.encode() if isinstance(content, str) else content
+    if os.path.isfile(path) and os.path.getsize(path) == len(data):
+        with open(path, "rb") as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    with open(f"{path}.{os.getpid()}.tmp", "wb") as f:
+        f.write(data)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
+    return True
+
+
+def count_write(path, start, figure=False, written=True):
+    size = os.path.getsize(path)
+    if written:
+        write_stats["files"] += 1
+        write_stats["bytes"] += size
+    else:
+        write_stats["unchanged"] += 1
+    write_stats["seconds"] += time.perf_counter() - start
+    if figure:
+        write_stats["figures"][os.path.basename(path)] = size
+        write_stats["paths"].append(path)
+
+
+def reset_write_stats():
+    stats = write_stats | {"figures": dict(write_stats["figures"]), "paths": list(write_stats["paths"])}
+    write_stats.update(files=0, bytes=0, seconds=0.0, unchanged=0, figures={}, paths=[])
+    return stats
+
+
+def add_write_stats(stats):
+    for key in ("files", "bytes", "seconds", "unchanged"):
+        write_stats[key] += stats[key]
+    write_stats["figures"].update(stats["figures"])
+    write_stats["paths"].extend(stats["paths"])
+
+
+def report_writes(label, largest=5):
+    stats = reset_write_stats()
+    print(f"Wrote {stats['files']} {label} files ({stats['bytes'] / 2**20:.2f} MiB) in {stats['seconds']:.2f}s "
+          f"as {FIGURE_OPTIONS['figure_format']}{' (compact)' if FIGURE_OPTIONS['compact_figures'] else ''} "
+          f"with plotly.js {FIGURE_OPTIONS['plotlyjs']}, {stats['unchanged']} unchanged files skipped")
+    figures = sorted(stats["figures"].items(), key=lambda item: item[1], reverse=True)
+    for figure, size in figures[:largest]:
+        print(f"  {figure}: {size / 2**10:.1f} KiB")
+
+
+def plotlyjs_file():
+    # with hashed figures, the file is named by the plotly.js version, so that it can be cached indefinitely as well
+    return f"plotly-{get_plotlyjs_version()}.min.js" if FIGURE_OPTIONS["hashed_figures"] else PLOTLYJS_FILE
+
+
+def write_plotlyjs(figures_directory):
+    # written once per figures directory and plotly version
+    if figures_directory in plotlyjs_written:
+        return
+    path = f"{figures_directory}/{plotlyjs_file()}"
+    start = time.perf_counter()
+    count_write(path, start, written=write_if_changed(path, get_plotlyjs()))
+    plotlyjs_written.add(figures_directory)
+
+
+# COMPACT FIGURE SERIALIZATION
+
+
+def decode_array(values):
+    # plotly may already have encoded an array as {dtype, bdata}
+    if isinstance(values, dict) and "bdata" in values:
+        array = np.frombuffer(base64.b64decode(values["bdata"]), dtype=values["dtype"])
+        return array.reshape(values["shape"]) if "shape" in values else array
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        # ragged nested lists, such as the outliers of precomputed boxes
+        return np.asarray(values, dtype=object)
+    if array.dtype.kind == "O" and array.size > 0:
+        try:
+            array = array.astype("datetime64[ms]") if hasattr(array.flat[0], "year") else array.astype(float)
+        except (TypeError, ValueError):
+            pass
+    return array
+
+
+def round_significant(array, digits):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        magnitude = np.floor(np.log10(np.abs(array)))
+        scale = 10.0 ** (digits - 1 - np.where(np.isfinite(magnitude), magnitude, 0))
+        return np.round(array * scale) / scale
+
+
+def encode_typed_array(array):
+    if not TYPED_ARRAYS or array.ndim != 1:
+        return array
+    return {"dtype": array.dtype.str[1:], "bdata": base64.b64encode(array.tobytes()).decode()}
+
+
+def compact_array(values, digits):
+    """returns the compact encoding of a trace array and whether it holds dates"""
+    array = decode_array(values)
+    if array.dtype.kind == "M":
+        # dates as milliseconds since the epoch, which date axes accept like date strings
+        milliseconds = array.astype("datetime64[ms]").astype("int64").astype("<f8")
+        milliseconds[np.isnat(array)] = np.nan
+        return encode_typed_array(milliseconds), True
+    if array.dtype.kind == "b":
+        return encode_typed_array(array.astype("u1")), False
+    if array.dtype.kind not in "iuf":
+        return values, False
+    if array.dtype.kind == "f":
+        if not (np.isfinite(array).all() and np.array_equal(array, np.round(array))
+                and np.abs(array).max(initial=0) < 2**31):
+            if digits:
+                array = round_significant(array, digits)
+            # float32 holds about 7 significant digits, but only within its normal range
+            magnitudes = np.abs(array[np.isfinite(array) & (array != 0)])
+            single = digits and digits <= 6 and (magnitudes.size == 0 or (
+                magnitudes.min() >= np.finfo("<f4").tiny and magnitudes.max() <= np.finfo("<f4").max))
+            return encode_typed_array(array.astype("<f4" if single else "<f8")), False
+        array = array.astype("int64")
+    for dtype in ("<u1", "<i1", "<u2", "<i2", "<u4", "<i4"):
+        info = np.iinfo(dtype)
+        if array.size == 0 or (array.min() >= info.min and array.max() <= info.max):
+            return encode_typed_array(array.astype(dtype)), False
+    return encode_typed_array(array.astype("<f8")), False
+
+
+def serialize_figure(fig, precision=None):
+    """returns the {data, layout} spec of a figure with compact trace arrays
+
+    Numeric arrays become base64 typed arrays of the smallest sufficient dtype, dates become milliseconds
+    since the epoch (on axes then typed as dates), and non-integer values are rounded to the significant
+    digits given per axis letter in precision."""
+    precision = FIGURE_OPTIONS["figure_precision"] if precision is None else precision
+    spec = fig.to_plotly_json()
+    for trace in spec["data"]:
+        for axis in ("x", "y"):
+            if trace.get(axis) is None or isinstance(trace[axis], str):
+                continue
+            trace[axis], dates = compact_array(trace[axis], precision.get(axis))
+            if dates:
+                key = f"{axis}axis{trace.get(f'{axis}axis', axis)[1:]}"
+                spec["layout"].setdefault(key, {}).setdefault("type", "date")
+    return spec
+
+
+def figure_variants(figures_directory, plot_category, name):
+    """the stems of the files of a figure (without extension), e.g., name and name.<content hash>"""
+    directory = f"{figures_directory}/{plot_category}"
+    if not os.path.isdir(directory):
+        return set()
+    pattern = re.compile(rf"{re.escape(name)}(\.[0-9a-f]{{{HASH_LENGTH}}})?\.(html|json)")
+    return {file.rsplit(".", 1)[0] for file in os.listdir(directory) if pattern.fullmatch(file)}
+
+
+def write_figure(fig, figures_directory, plot_category, name):
+    os.makedirs(f"{figures_directory}/{plot_category}", exist_ok=True)
+    extensions = FIGURE_FORMATS[FIGURE_OPTIONS["figure_format"]]
+    if FIGURE_OPTIONS["compact_figures"]:
+        fig = serialize_figure(fig)
+    spec = None
+    if ".json" in extensions or FIGURE_OPTIONS["hashed_figures"]:
+        spec = to_json_plotly(fig, engine="orjson" if orjson else "json")
+    stem = name
+    if FIGURE_OPTIONS["hashed_figures"]:
+        # one hash for all formats, so that the dashboard can switch between them
+        stem = f"{name}.{hashlib.sha256((spec + plotlyjs_file()).encode()).hexdigest()[:HASH_LENGTH]}"
+    for variant in figure_variants(figures_directory, plot_category, name) - {stem}:
+        # outdated content-hashed files, or those of the other naming
+        for extension in (".html", ".json"):
+            outdated = f"{figures_directory}/{plot_category}/{variant}{extension}"
+            if os.path.exists(outdated):
+                os.remove(outdated)
+            if outdated in write_stats["paths"]:
+                # written before by this process (e.g., a figure shown twice), so no longer an output of it
+                write_stats["paths"].remove(outdated)
+                write_stats["figures"].pop(os.path.basename(outdated), None)
+    path = f"{figures_directory}/{plot_category}/{stem}"
+    if ".json" in extensions:
+        # the dashboard renders specs with the shared plotly.js, so it is written regardless of the plotlyjs mode
+        write_plotlyjs(figures_directory)
+        start = time.perf_counter()
+        count_write(f"{path}.json", start, figure=True, written=write_if_changed(f"{path}.json", spec))
+    if ".html" in extensions:
+        include_plotlyjs = True
+        if FIGURE_OPTIONS["plotlyjs"] == "shared":
+            write_plotlyjs(figures_directory)
+            include_plotlyjs = f"../{plotlyjs_file()}"
+        start = time.perf_counter()
+        # a fixed div id instead of a random one keeps the output identical across runs
+        html = pio.to_html(fig, config={"responsive": True}, div_id=name,
+                           include_plotlyjs=include_plotlyjs, validate=False)
+        count_write(f"{path}.html", start, figure=True, written=write_if_changed(f"{path}.html", html))
+
+
+def written_figures(since=0):
+    """paths of the figure files written (or found unchanged) by this process, from the given position on"""
+    return write_stats["paths"][since:]
+
+
+def figure_file(figures_directory, plot_category, name):
+    """the path of a figure relative to the figures directory and without extension, or None if there is none"""
+    variants = figure_variants(figures_directory, plot_category, name)
+    if not variants:
+        return None
+    # prefers the naming of the current configuration, should files of both exist
+    stem = max(sorted(variants), key=lambda variant: (variant != name) == FIGURE_OPTIONS["hashed_figures"])
+    return f"{plot_category}/{stem}"
+
+
+def figure_exists(figures_directory, plot_category, name):
+    return figure_file(figures_directory, plot_category, name) is not None
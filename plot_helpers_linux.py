@@ -1,8 +1,11 @@
 import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 import os
 import scipy
+from output_helpers import FIGURE_OPTIONS, decode_array, write_figure
+from metrics_helpers import as_float, big_sum_groups
 # helper functions for drawing plots
 
 
@@ -25,6 +28,11 @@ def estimate_trend(
         idx = 0
     intercept = results.iloc[idx]["px_fit_results"].params[0]
     slope = results.iloc[idx]["px_fit_results"].params[1]
+    return trend(intercept, slope, xs=xs, key=key)
+
+
+def trend(intercept, slope, xs=[], key=lambda x: x.timestamp()):
+    """the daily, weekly, monthly and yearly slope of a trend line and its predictions for xs, as estimate_trend"""
     daily = slope * pd.to_timedelta(1, unit="D").total_seconds()
     weekly = slope * pd.to_timedelta(7, unit="D").total_seconds()
     monthly = slope * pd.to_timedelta(1, unit="D").total_seconds() * 30.437
@@ -32,6 +40,39 @@ def estimate_trend(
     return daily, weekly, monthly, yearly, [intercept + slope * key(x) for x in xs]
 
 
+def trend_x(series):
+    # dates are fitted in seconds since the epoch, as by plotly and the default key of estimate_trend
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return (series - pd.Timestamp(0)) / pd.Timedelta(seconds=1)
+    return as_float(series)
+
+
+def fit_trends(df, x, y, by=()):
+    """intercept and slope of the OLS trend line of y over x for each group in by, like px.scatter(...,
+    trendline="ols") and estimate_trend, but for all groups at once and without figures
+
+    The least squares solution of each group is computed from the group sums of the centered values in one
+    vectorized pass. As with statsmodels, the minimum norm solution is taken if all x of a group are equal.
+    Returns a frame indexed by the groups (a single group 0 if by is empty) with intercept, slope and the
+    number of points; groups with less than two points, for which plotly draws no trend line, are left out."""
+    keys = list(by) or ["group"]
+    points = pd.DataFrame({"x": trend_x(df[x]).to_numpy(), "y": as_float(df[y]).to_numpy()})
+    for column in keys:
+        points[column] = df[column].to_numpy() if by else 0
+    points = points.dropna(subset=["x", "y"])
+    groups = points.groupby(keys, observed=True, sort=False)
+    means = groups[["x", "y"]].transform("mean")
+    points["xx"] = (points["x"] - means["x"]) ** 2
+    points["xy"] = (points["x"] - means["x"]) * (points["y"] - means["y"])
+    fits = points.groupby(keys, observed=True, sort=False).agg(
+        x=("x", "mean"), y=("y", "mean"), xx=("xx", "sum"), xy=("xy", "sum"), points=("x", "size"))
+    fits = fits[fits["points"] > 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fits["slope"] = np.where(fits["xx"] > 0, fits["xy"] / fits["xx"], fits["x"] * fits["y"] / (1 + fits["x"] ** 2))
+    fits["intercept"] = np.where(fits["xx"] > 0, fits["y"] - fits["slope"] * fits["x"], fits["y"] / (1 + fits["x"] ** 2))
+    return fits[["intercept", "slope", "points"]]
+
+
 def committer_date_x_axis(fig, df, append_revision=True, step=1):
     axis = df[["committer_date", "revision"]].drop_duplicates()
     axis["year"] = axis["committer_date"].apply(lambda d: str(d.year))
@@ -103,12 +144,121 @@ def style_legend(fig, position="topleft", xshift=0, yshift=0):
         fig.update_layout(showlegend=False)
 
 
+def box_statistics(values, max_outliers):
+    """quartiles, whiskers and outliers of a box, computed as plotly.js does for its default quartile method
+
+    At most max_outliers outliers are kept, evenly spaced over the sorted outliers, so that the extremes remain."""
+    values = np.sort(values)
+    q1, median, q3 = np.percentile(values, [25, 50, 75], method="hazen")
+    inliers = values[(values >= q1 - 1.5 * (q3 - q1)) & (values <= q3 + 1.5 * (q3 - q1))]
+    lowerfence = min(q1, inliers[0])
+    upperfence = max(q3, inliers[-1])
+    outliers = values[(values < lowerfence) | (values > upperfence)]
+    if len(outliers) > max_outliers:
+        outliers = outliers[np.linspace(0, len(outliers) - 1, max_outliers).round().astype(int)]
+    return q1, median, q3, lowerfence, upperfence, outliers
+
+
+def precompute_boxes(fig, max_outliers=100):
+    # replaces the samples of each box trace with one precomputed box per position, so that
+    # the figure size no longer grows with the number of samples; plotly.js shows the remaining
+    # samples of each box (given as nested arrays) as its outliers
+    for trace in fig.data:
+        if trace.type != "box" or trace.q1 is not None or trace.y is None:
+            continue
+        values = pd.Series(np.asarray(trace.y, dtype=float))
+        positions = pd.Series(trace.x if trace.x is not None else [trace.x0] * len(values), dtype=object)
+        groups = values[values.notna()].groupby(positions[values.notna()], sort=False)
+        boxes = [(position, box_statistics(group.to_numpy(), max_outliers)) for position, group in groups]
+        trace.update(
+            x=[position for position, _ in boxes],
+            y=[statistics[5].tolist() for _, statistics in boxes],
+            **{key: [statistics[i] for _, statistics in boxes]
+               for i, key in enumerate(["q1", "median", "q3", "lowerfence", "upperfence"])},
+        )
+
+
 def style_box(fig, legend_position="topleft", xshift=0, yshift=0):
     fig.update_traces(fillcolor="rgba(0,0,0,0)")
     fig.update_traces(line_width=1)
     fig.update_traces(marker_size=2)
     fig.update_layout(font_family="Linux Biolinum")
     style_legend(fig, legend_position, xshift, yshift)
+    if FIGURE_OPTIONS["box_statistics"]:
+        precompute_boxes(fig, FIGURE_OPTIONS["box_outliers"])
+
+
+def axis_values(values, log=False):
+    # positions of points along an axis as floats, dates in milliseconds and log axes in log10
+    values = decode_array(values)
+    values = values.astype("datetime64[ms]").astype(float) if values.dtype.kind == "M" else values.astype(float)
+    if log:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.log10(values)
+    return values
+
+
+def decimate_scatter(traces, layout, bins):
+    """indices of the points of each trace to keep, one per occupied cell of a bins x bins grid over its subplot
+
+    Points within one cell overlap at that resolution, so the plot looks the same as long as a cell is
+    smaller than a marker. Missing points, which are not drawn anyway, are dropped."""
+    positions = []
+    for trace in traces:
+        xaxis = layout[f"xaxis{(trace.xaxis or 'x')[1:]}"]
+        yaxis = layout[f"yaxis{(trace.yaxis or 'y')[1:]}"]
+        positions.append((trace.xaxis, trace.yaxis, axis_values(trace.x, xaxis.type == "log"),
+                          axis_values(trace.y, yaxis.type == "log")))
+    subplots = {}
+    for xaxis, yaxis, x, y in positions:
+        valid = np.isfinite(x) & np.isfinite(y)
+        if valid.any():
+            low, high = subplots.get((xaxis, yaxis), ([np.inf, np.inf], [-np.inf, -np.inf]))
+            subplots[(xaxis, yaxis)] = (np.minimum(low, [x[valid].min(), y[valid].min()]),
+                                        np.maximum(high, [x[valid].max(), y[valid].max()]))
+    indices = []
+    for xaxis, yaxis, x, y in positions:
+        valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        if valid.size == 0:
+            indices.append(valid)
+            continue
+        low, high = subplots[(xaxis, yaxis)]
+        extent = np.where(high > low, high - low, 1)
+        cells = np.clip(((np.column_stack([x[valid], y[valid]]) - low) / extent * bins).astype(int), 0, bins - 1)
+        indices.append(np.sort(valid[np.unique(cells[:, 0] * bins + cells[:, 1], return_index=True)[1]]))
+    return indices
+
+
+def large_scatter(fig, threshold, bins=None):
+    # draws scatter plots with more than threshold points with WebGL instead of SVG (and the others with SVG),
+    # optionally decimating their points with decimate_scatter; what was done is recorded in layout.meta
+    traces = [trace for trace in fig.data if trace.type in ("scatter", "scattergl") and trace.x is not None]
+    if not traces:
+        return
+    points = sum(len(decode_array(trace.x)) for trace in traces)
+    webgl = points > threshold
+    kept = points
+    if webgl and bins:
+        indices = decimate_scatter(traces, fig.layout, bins)
+        kept = sum(len(index) for index in indices)
+        for trace, index in zip(traces, indices):
+            for key in ("x", "y", "customdata", "text", "hovertext"):
+                if trace[key] is not None and not isinstance(trace[key], str):
+                    trace[key] = decode_array(trace[key])[index]
+            for key in ("color", "size", "symbol"):
+                if trace.marker[key] is not None and not isinstance(trace.marker[key], (str, int, float)):
+                    trace.marker[key] = np.asarray(trace.marker[key])[index]
+    constructor, kind = (go.Scattergl, "scattergl") if webgl else (go.Scatter, "scatter")
+    if any(trace.type != kind for trace in traces):
+        converted = [constructor({key: value for key, value in trace.to_plotly_json().items() if key != "type"},
+                                 skip_invalid=True)
+                     if trace.type in ("scatter", "scattergl") and trace.x is not None else trace
+                     for trace in fig.data]
+        fig.data = []
+        fig.add_traces(converted)
+    if webgl:
+        fig.update_layout(meta=dict(large_scatter=dict(
+            threshold=threshold, points=points, kept=kept, bins=bins, ratio=kept / points if points else 1)))
 
 
 def style_scatter(fig, marker_size=4, legend_position="topleft", xshift=0, yshift=0):
@@ -116,6 +266,7 @@ def style_scatter(fig, marker_size=4, legend_position="topleft", xshift=0, yshif
         fig.update_traces(marker_size=marker_size)
     style_legend(fig, legend_position, xshift, yshift)
     fig.update_layout(font_family="Linux Biolinum")
+    large_scatter(fig, FIGURE_OPTIONS["scatter_webgl_threshold"], FIGURE_OPTIONS["scatter_bins"])
 
 
 def plot_failures(
@@ -258,6 +409,26 @@ def filter_extractor(df, extractor):
     return df[df["extractor"] == extractor]
 
 
+class ArchitecturePartition:
+    """per-architecture sub-frames of a frame, split in one pass so that each plot takes its slice in O(1)"""
+
+    def __init__(self, df):
+        self.all = df
+        self.architectures = dict(tuple(df.groupby("architecture", observed=True, sort=False)))
+
+    def __getitem__(self, architecture):
+        if architecture == "all":
+            return self.all
+        return self.architectures.get(architecture, self.all.iloc[:0])
+
+
+def select_architecture(df, architecture):
+    # accepts a frame or an ArchitecturePartition of it; "all" returns the frame itself
+    if isinstance(df, ArchitecturePartition):
+        return df[architecture]
+    return df if architecture == "all" else df[df["architecture"] == architecture]
+
+
 def annotate_value(
     fig,
     x,
@@ -294,19 +465,12 @@ def show(fig, figures_directory, name, plot_category, margin=None):
         fig.update_layout(margin=margin)
     else:
         fig.update_layout(margin=dict(l=0, r=0, t=0, b=0))
-    if not os.path.exists(figures_directory):
-        os.mkdir(figures_directory)
-    if not os.path.exists(f"{figures_directory}/{plot_category}"):
-        os.mkdir(f"{figures_directory}/{plot_category}")
-    fig.write_html(
-        f"{figures_directory}/{plot_category}/{name}.html", config={"responsive": True}
-    )
+    write_figure(fig, figures_directory, plot_category, name)
 
 
 def jaccard_similarity(df_features, architecture, output_dir):
     # # Jaccard similarity to features (RQ2)
-    if architecture != "all":
-        df_features = df_features[df_features["architecture"] == architecture]
+    df_features = select_architecture(df_features, architecture)
     df_features_long = pd.melt(
         df_features,
         id_vars=['extractor'],
@@ -357,8 +521,7 @@ def jaccard_similarity(df_features, architecture, output_dir):
 
 
 def configuration_similarity(df_solve_unconstrained, architecture, output_dir):
-    if architecture != "all":
-        df_solve_unconstrained = df_solve_unconstrained[df_solve_unconstrained["architecture"] == architecture]
+    df_solve_unconstrained = select_architecture(df_solve_unconstrained, architecture)
     df_solve_unconstrained = df_solve_unconstrained[~df_solve_unconstrained['similarity'].isna()]
     if df_solve_unconstrained["similarity"].empty:
         print(
@@ -387,8 +550,7 @@ def configuration_similarity(df_solve_unconstrained, architecture, output_dir):
 
 
 def share_of_feature_variables(df_features, architecture, output_dir):
-    if architecture != "all":
-        df_features = df_features[df_features["architecture"] == architecture]
+    df_features = select_architecture(df_features, architecture)
     df_features_long = pd.melt(
         df_features[~df_features['#features'].isna()].assign(**{
             '#dead_feature_variables': df_features['#dead_feature_variables'] / df_features['#ALL_feature_variables'],
@@ -476,7 +638,7 @@ def total_features(df_features, output_dir):
 
 
 def features(df_features, architecture, output_dir):
-    df_features = df_features[df_features["architecture"] == architecture]
+    df_features = select_architecture(df_features, architecture)
     df_features = df_features[~df_features['#features'].isna()]
     if df_features["#features"].empty:
         print(
@@ -535,8 +697,7 @@ def features(df_features, architecture, output_dir):
 
 
 def model_count_time(df_solve, architecture, output_dir):
-    if architecture != "all":
-        df_solve = df_solve[df_solve["architecture"] == architecture]
+    df_solve = select_architecture(df_solve, architecture)
     df_solve = df_solve[~df_solve['model-count-log10'].isna()]
     if df_solve.empty:
         print(
@@ -558,19 +719,11 @@ def model_count_time(df_solve, architecture, output_dir):
         l=0, r=0, t=20, b=0), plot_category="model-count-time")
 
 
-def big_sum(series):
-    big_sum = sum([int(value)
-                  for value in series if not pd.isna(value) and value])
-    if big_sum > 0:
-        return len(str(big_sum))
-
-
 def model_count(df_solve_total, df_solve_slice, architecture, output_dir):
     if architecture == "all":
-        _mct(df_solve_total, df_solve_slice, output_dir)
+        _mct(df_solve_total, select_architecture(df_solve_slice, "all"), output_dir)
         return
-    df_solve_slice = df_solve_slice[df_solve_slice["architecture"]
-                                    == architecture]
+    df_solve_slice = select_architecture(df_solve_slice, architecture)
     df_solve_slice = df_solve_slice[~df_solve_slice['model-count-unconstrained-log10'].isna()]
     if df_solve_slice["model-count-unconstrained-log10"].empty:
         print(
@@ -635,6 +788,9 @@ def _mct(df_solve_total, df_solve_slice, output_dir):
     fig.update_traces(marker_line_color='rgba(0,0,0,0)')
     def fn1(prefix, y): return prefix
     def fn2(prefix, y): return '10<sup>' + format(round(y), ',') + '</sup>'
+    totals = big_sum_groups(df_solve_slice, ['extractor', 'revision', 'committer_date'], 'model-count-unconstrained')
+    totals = totals['digits'].rename('model-count-unconstrained').reset_index()
+    def total(extractor, revision): return totals[(totals['extractor'] == extractor) & (totals['revision'] == revision)]
     annotate_value(fig, 'committer_date', 0, 1, 'v2.5.45', 0, -15, 'center',
                    df_solve_slice[df_solve_slice['revision'] == 'v2.5.45'], fn1)
     annotate_value(fig, 'committer_date', 0, 1, 'v2.6.7', 0, -30, 'center',
@@ -642,42 +798,31 @@ def _mct(df_solve_total, df_solve_slice, output_dir):
     annotate_value(fig, 'committer_date', 0, 1, 'v2.6.13', 5, -15, 'center',
                    df_solve_slice[df_solve_slice['revision'] == 'v2.6.13'], fn1)
     annotate_value(fig, 'committer_date', 'model-count-unconstrained', 1, 'KCR', 15, 0, 'left',
-                   df_solve_slice[(df_solve_slice['extractor'] == 'KConfigReader') & (
-                       df_solve_slice['revision'] == 'v2.5.45')]
-                   .groupby(['extractor', 'committer_date']).agg({'model-count-unconstrained': big_sum}).reset_index(), fn2)
+                   total('KConfigReader', 'v2.5.45'), fn2)
     annotate_value(fig, 'committer_date', 'model-count-unconstrained', 1, 'KCR', 10, 10, 'left',
-                   df_solve_slice[(df_solve_slice['extractor'] == 'KConfigReader') & (
-                       df_solve_slice['revision'] == 'v2.6.7')]
-                   .groupby(['extractor', 'committer_date']).agg({'model-count-unconstrained': big_sum}).reset_index(), fn2)
+                   total('KConfigReader', 'v2.6.7'), fn2)
     annotate_value(fig, 'committer_date', 'model-count-unconstrained', 1, 'KCR', 15, -10, 'left',
-                   df_solve_slice[(df_solve_slice['extractor'] == 'KConfigReader') & (
-                       df_solve_slice['revision'] == 'v2.6.13')]
-                   .groupby(['extractor', 'committer_date']).agg({'model-count-unconstrained': big_sum}).reset_index(), fn2)
+                   total('KConfigReader', 'v2.6.13'), fn2)
     annotate_value(fig, 'committer_date', 0, 2, 'v2.5.45', 0, -15, 'center',
                    df_solve_slice[df_solve_slice['revision'] == 'v2.5.45'], fn1)
     annotate_value(fig, 'committer_date', 0, 2, 'v2.6.23', 0, -15, 'center',
                    df_solve_slice[df_solve_slice['revision'] == 'v2.6.23'], fn1)
     annotate_value(fig, 'committer_date', 'model-count-unconstrained', 2, 'KCl', 25, 5, 'left',
-                   df_solve_slice[(df_solve_slice['extractor'] == 'KClause') & (
-                       df_solve_slice['revision'] == 'v2.5.45')]
-                   .groupby(['extractor', 'committer_date']).agg({'model-count-unconstrained': big_sum}).reset_index(), fn2)
+                   total('KClause', 'v2.5.45'), fn2)
     annotate_value(fig, 'committer_date', 'model-count-unconstrained', 2, 'KCl', 15, -15, 'left',
-                   df_solve_slice[(df_solve_slice['extractor'] == 'KClause') & (
-                       df_solve_slice['revision'] == 'v2.6.23')]
-                   .groupby(['extractor', 'committer_date']).agg({'model-count-unconstrained': big_sum}).reset_index(), fn2)
+                   total('KClause', 'v2.6.23'), fn2)
     fig.update_xaxes(range=["2002-01-01", "2024-12-01"])
     fig.update_yaxes(range=[0, 1050], dtick=200)
     show(fig, output_dir, 'model-count-linux-all', plot_category="model-count")
 
 
 def sloc(df_kconfig, architecture, output_dir):
-    df_kconfig = df_kconfig[~df_kconfig['source_lines_of_code'].isna()]
-    if df_kconfig.dropna(subset=["source_lines_of_code"]).empty:
+    if select_architecture(df_kconfig, "all").dropna(subset=["source_lines_of_code"]).empty:
         print(
             f"#SLOC plot for project/architecture 'Linux/{architecture}' could not be created because 'df_kconfig[\"source_lines_of_code\"]' is empty.")
         return
-    if architecture != "all":
-        df_kconfig = df_kconfig[df_kconfig["architecture"] == architecture]
+    df_kconfig = select_architecture(df_kconfig, architecture)
+    df_kconfig = df_kconfig[~df_kconfig['source_lines_of_code'].isna()]
     fig = px.scatter(
         df_kconfig,
         x="committer_date",
@@ -694,10 +839,8 @@ def sloc(df_kconfig, architecture, output_dir):
 
 
 def feature_evolution(df_features, architecture, output_dir):
-    f = "total"
-    if architecture != "all":
-        df_features = df_features[df_features["architecture"] == architecture]
-        f = "arch"
+    f = "total" if architecture == "all" else "arch"
+    df_features = select_architecture(df_features, architecture)
     for df in [df_features[df_features['year'] >= 2005]]:
         for (added, removed, df, label, file, y_color) in [('#total_added_features', '#total_removed_features', df[['extractor', '#total_added_features', '#total_removed_features']].drop_duplicates(), 'Change in #Features (log<sub>10</sub>)', 'total', 'black'), ('#added_features', '#removed_features', df, ' ', 'arch', 'white')]:
             df_features_long = pd.melt(
@@ -737,8 +880,7 @@ def feature_evolution(df_features, architecture, output_dir):
                 l=0, r=0, t=21, b=0), plot_category=f"feature-evolution-{f}")
 
 def prediction_accuracies(deviations, architecture, output_dir):
-    if architecture != "all":
-        deviations = deviations[deviations["architecture"] == architecture]
+    deviations = select_architecture(deviations, architecture)
     for metric in ['features', 'configurations', 'configurations-by-features']:
         df_tmp = deviations[deviations['metric'] == metric]
         df_tmp = df_tmp[~df_tmp['deviation'].isna()]
@@ -746,6 +888,9 @@ def prediction_accuracies(deviations, architecture, output_dir):
             print(
                 f"Prediction Accuracy plot for project/architecture Linux/'{architecture}' could not be created because 'deviations[\"{metric}\"]' is empty.")
             continue
+        # backtested deviations have one row of boxes per horizon
+        horizons = {'facet_row': 'horizon', 'category_orders': {'horizon': list(dict.fromkeys(df_tmp['horizon']))}} \
+            if 'horizon' in deviations else dict()
         fig = px.box(
             deviations[deviations['metric'] == metric],
             x='is-total',
@@ -754,7 +899,8 @@ def prediction_accuracies(deviations, architecture, output_dir):
             facet_col='extractor',
             facet_col_spacing=0.1,
             labels={'deviation': f'Relative Deviation ({architecture})' if metric ==
-                    'features' else '', 'extractor': 'Extractor'},
+                    'features' else '', 'extractor': 'Extractor', 'horizon': 'Horizon'},
+            **horizons
         )
         fig.update_traces(width=0.5)
         fig.update_yaxes(range=[-1.1, 1.1])
@@ -764,8 +910,7 @@ def prediction_accuracies(deviations, architecture, output_dir):
             l=0, r=0, t=21, b=0), plot_category=f"prediction-accuracy-{metric}")
 
 def plot_configuration_evolution(file, df, y, architecture, output_dir, y_color='black'):
-    df['x'] = ' '
-    df = df[~df[y].isna()]
+    df = df[~df[y].isna()].assign(x=' ')
     if df[y].empty:
         print(
             f"'Configuration Evolution' plot for project/architecture Linux/'{architecture}' could not be created because 'df[\"{y}\"]' is empty.")
@@ -787,15 +932,9 @@ def plot_configuration_evolution(file, df, y, architecture, output_dir, y_color=
     show(fig, output_dir, f'configuration-evolution-{file}-linux-{architecture}', plot_category=f"configuration-evolution-{file}")
 
 
-def configuration_evolution(df_solve_total, df_solve_unconstrained_diff, arch, output_dir):
+def configuration_evolution(df_solve_total_diff, df_solve_unconstrained_diff, arch, output_dir):
     if arch == "all":
-        df_solve_total_diff = df_solve_total.copy().sort_values(by='committer_date')
-        df_solve_total_diff = df_solve_total_diff[df_solve_total_diff['is-upper-bound']]
-        for extractor in set(df_solve_total_diff['extractor']):
-                df_solve_total_diff.loc[(df_solve_total_diff['extractor'] == extractor), ['model-count-unconstrained']] = df_solve_total_diff[(df_solve_total_diff['extractor'] == extractor)]['model-count-unconstrained'].diff()
         plot_configuration_evolution('total', df_solve_total_diff, 'model-count-unconstrained', arch, output_dir)
     else:
-        for extractor in set(df_solve_unconstrained_diff['extractor']):
-            for architecture in set(df_solve_unconstrained_diff['architecture']):
-                df_solve_unconstrained_diff.loc[(df_solve_unconstrained_diff['architecture'] == architecture) & (df_solve_unconstrained_diff['extractor'] == extractor), ['model-count-unconstrained-log10']] = df_solve_unconstrained_diff[(df_solve_unconstrained_diff['architecture'] == architecture) & (df_solve_unconstrained_diff['extractor'] == extractor)]['model-count-unconstrained-log10'].diff()
+        df_solve_unconstrained_diff = select_architecture(df_solve_unconstrained_diff, arch)
         plot_configuration_evolution('arch', df_solve_unconstrained_diff, 'model-count-unconstrained-log10', arch, output_dir, 'white')
@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import os
 import scipy
+from output_helpers import write_figure
 # helper functions for drawing plots
 
 
@@ -287,11 +288,7 @@ def show(fig, figures_directory, name, plot_category, margin=None):
         fig.update_layout(margin=margin)
     else:
         fig.update_layout(margin=dict(l=0, r=0, t=0, b=0))
-    if not os.path.exists(f"{figures_directory}/{plot_category}"):
-        os.mkdir(f"{figures_directory}/{plot_category}")
-    fig.write_html(
-        f"{figures_directory}/{plot_category}/{name}.html", config={"responsive": True}
-    )
+    write_figure(fig, figures_directory, plot_category, name)
 
 
 def total_features(df, project, output_dir):
@@ -24,3 +24,8 @@ export interface ScatterData {
     },
     history: HistoryData
 }
+export interface ProjectIndex {
+    plots: string[],
+    shard: string
+}
+export type ProjectData = Record<string, any>